@@ -1,5 +1,26 @@
 from django.contrib import admin
-from .models import Poll, Question, Choice, Answer
+from .admin_filters import AutocompleteFilter, AutocompleteFilterMixin
+from .models import Poll, Question, Choice, Respondent, Answer
+from .pagination import EstimatedCountPaginator
+
+
+class PollFilter(AutocompleteFilter):
+    title = 'poll'
+    field_name = 'poll'
+    parameter_name = 'poll_id'
+
+
+class ChoicePollFilter(AutocompleteFilter):
+    title = 'poll'
+    model = Question
+    field_name = 'poll'
+    parameter_name = 'question__poll_id'
+
+
+class QuestionFilter(AutocompleteFilter):
+    title = 'question'
+    field_name = 'question'
+    parameter_name = 'question_id'
 
 
 class ChoiceInline(admin.TabularInline):
@@ -10,6 +31,7 @@ class ChoiceInline(admin.TabularInline):
 class QuestionInline(admin.TabularInline):
     model = Question
     extra = 1
+    autocomplete_fields = ['depends_on_question']
     fields = ['text', 'question_type', 'order', 'is_required', 'depends_on_question', 'condition_value', 'condition_operator']
 
 
@@ -18,7 +40,8 @@ class PollAdmin(admin.ModelAdmin):
     list_display = ['title', 'creator', 'created_at', 'expires_at', 'is_active', 'is_expired']
     list_filter = ['is_active', 'created_at', 'expires_at']
     search_fields = ['title', 'description', 'creator__username']
-    readonly_fields = ['created_at', 'is_expired']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'closed_at', 'is_expired']
     inlines = [QuestionInline]
     
     fieldsets = (
@@ -29,41 +52,64 @@ class PollAdmin(admin.ModelAdmin):
             'fields': ('expires_at', 'is_active', 'allow_anonymous')
         }),
         ('Timestamps', {
-            'fields': ('created_at',),
+            'fields': ('created_at', 'closed_at'),
             'classes': ('collapse',)
         }),
     )
 
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['text', 'poll', 'question_type', 'order', 'is_required', 'has_conditional_logic']
-    list_filter = ['question_type', 'is_required', 'poll']
+    list_filter = ['question_type', 'is_required', PollFilter]
+    list_select_related = ['poll']
     search_fields = ['text', 'poll__title']
+    autocomplete_fields = ['poll', 'depends_on_question']
     ordering = ['poll', 'order']
     inlines = [ChoiceInline]
     
     def has_conditional_logic(self, obj):
-        return bool(obj.depends_on_question)
+        # Compare the raw FK so the changelist doesn't fetch the related question
+        return obj.depends_on_question_id is not None
     has_conditional_logic.boolean = True
     has_conditional_logic.short_description = 'Conditional Logic'
 
 
 @admin.register(Choice)
-class ChoiceAdmin(admin.ModelAdmin):
+class ChoiceAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['text', 'question', 'order']
-    list_filter = ['question__poll']
+    list_filter = [ChoicePollFilter]
+    list_select_related = ['question__poll']
+    autocomplete_fields = ['question']
     search_fields = ['text', 'question__text']
     ordering = ['question', 'order']
 
 
+@admin.register(Respondent)
+class RespondentAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+    list_display = ['id', 'poll', 'user', 'status', 'started_at', 'completed_at']
+    list_filter = ['status', PollFilter]
+    list_select_related = ['poll', 'user']
+    search_fields = ['poll__title', 'user__username', 'session_id']
+    autocomplete_fields = ['poll', 'user']
+    readonly_fields = ['session_id', 'started_at', 'completed_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 @admin.register(Answer)
-class AnswerAdmin(admin.ModelAdmin):
+class AnswerAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['poll', 'question', 'user_or_session', 'created_at']
-    list_filter = ['poll', 'question__question_type', 'created_at']
+    list_filter = [PollFilter, QuestionFilter, 'question__question_type', 'created_at']
+    # Question.__str__ uses its poll, and user_or_session the user
+    list_select_related = ['poll', 'question__poll', 'user']
     search_fields = ['poll__title', 'question__text', 'user__username']
+    autocomplete_fields = ['poll', 'question', 'respondent', 'user']
     readonly_fields = ['created_at']
+    # Answers run into the millions: estimate the total instead of COUNT(*)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def user_or_session(self, obj):
-        return obj.user.username if obj.user else f"Anonymous ({obj.session_id})"
+        return obj.user.username if obj.user else f"Anonymous ({obj.respondent_id})"
     user_or_session.short_description = 'User/Session'
@@ -0,0 +1,72 @@
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """List filter using the admin's autocomplete widget instead of links.
+    
+    The default related-field filter renders a link for every related row,
+    which is unusable with thousands of polls or questions. Subclasses set
+    ``field_name`` to a foreign key (on ``model`` if given, otherwise on the
+    filtered model) and ``parameter_name`` to the lookup on the filtered model.
+    The related model's admin must define ``search_fields``.
+    """
+    template = 'admin/polls/autocomplete_filter.html'
+    field_name = None
+    model = None
+    
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        field = (self.model or model)._meta.get_field(self.field_name)
+        # The widget renders its selected option from a model choice field
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+    
+    def lookups(self, request, model_admin):
+        return ()
+    
+    def has_output(self):
+        return True
+    
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        if not value.isdigit():
+            return queryset.none()
+        return queryset.filter(**{self.parameter_name: value})
+    
+    def choices(self, changelist):
+        value = self.value()
+        yield {
+            'widget': self.form_field.widget.render(
+                self.parameter_name, value if value and value.isdigit() else None,
+                attrs={'id': f'id_filter_{self.parameter_name}'}
+            ),
+            'hidden_params': [
+                (key, value) for key, value in changelist.params.items()
+                if key not in (self.parameter_name, 'p')
+            ],
+            'selected': self.value() is not None,
+            'reset_query_string': changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+
+class AutocompleteFilterMixin:
+    """Add the media needed by AutocompleteFilter to a ModelAdmin."""
+    
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=[
+                'admin/js/vendor/jquery/jquery.js',
+                'admin/js/jquery.init.js',
+                'polls/admin/autocomplete_filter.js',
+            ])
+        )
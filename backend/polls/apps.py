@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class PollsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'polls'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from smart_polling.metrics import record_connection_created
+
+        connection_created.connect(record_connection_created)
+
+        from . import signals  # noqa: F401
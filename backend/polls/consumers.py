@@ -1,13 +1,23 @@
+import asyncio
 import json
+import time
+import msgpack
+from django.conf import settings
+from channels.consumer import SyncConsumer
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .models import Poll
+from .projections import catch_up_all
+from .protocol import negotiate
 
 
 class PollConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.poll_id = self.scope['url_route']['kwargs']['poll_id']
         self.room_group_name = f'poll_{self.poll_id}'
+        self.codec, subprotocol = negotiate(self.scope.get('subprotocols', []))
+        self.pending = []
+        self.flush_task = None
         
         # Check if poll exists
         poll_exists = await self.poll_exists()
@@ -21,19 +31,25 @@ class PollConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
         
-        await self.accept()
+        await self.accept(subprotocol=subprotocol)
     
     async def disconnect(self, close_code):
+        if getattr(self, 'flush_task', None):
+            self.flush_task.cancel()
+        
         # Leave room group
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Handle incoming messages from WebSocket."""
         try:
-            text_data_json = json.loads(text_data)
+            if bytes_data is not None:
+                text_data_json = msgpack.unpackb(bytes_data)
+            else:
+                text_data_json = json.loads(text_data)
             message_type = text_data_json.get('type')
             
             if message_type == 'poll_update':
@@ -45,15 +61,55 @@ class PollConsumer(AsyncWebsocketConsumer):
                         'message': text_data_json.get('message', 'Poll updated')
                     }
                 )
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, msgpack.UnpackException, ValueError, AttributeError):
             pass
     
     async def poll_update(self, event):
         """Send poll update to WebSocket."""
-        await self.send(text_data=json.dumps({
+        await self.queue_message({
             'type': 'poll_update',
             'message': event['message']
-        }))
+        })
+    
+    async def poll_closed(self, event):
+        """Tell the client the poll has closed, then hang up."""
+        await self.queue_message({
+            'type': 'poll_closed',
+            'poll_id': event['poll_id'],
+            'closed_at': event['closed_at']
+        })
+        await self.flush()
+        await self.close()
+    
+    async def queue_message(self, message):
+        """Send a message, batching it with others if the codec supports it.
+        
+        Batched messages are flushed WS_BATCH_INTERVAL seconds after the first
+        one is queued, or as soon as WS_BATCH_MAX_MESSAGES are waiting.
+        """
+        self.pending.append(message)
+        if not self.codec.batched or len(self.pending) >= settings.WS_BATCH_MAX_MESSAGES:
+            await self.flush()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+    
+    async def flush_later(self):
+        await asyncio.sleep(settings.WS_BATCH_INTERVAL)
+        self.flush_task = None
+        await self.flush()
+    
+    async def flush(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        if not self.pending:
+            return
+        messages, self.pending = self.pending, []
+        for frame in self.codec.encode(messages):
+            if self.codec.binary:
+                await self.send(bytes_data=frame)
+            else:
+                await self.send(text_data=frame)
     
     @database_sync_to_async
     def poll_exists(self):
@@ -62,3 +118,20 @@ class PollConsumer(AsyncWebsocketConsumer):
             return Poll.objects.filter(id=self.poll_id, is_active=True).exists()
         except:
             return False
+
+
+class ProjectionConsumer(SyncConsumer):
+    """Channel worker applying new submission events to the projections.
+    
+    Run with ``python manage.py runworker projections``. Notifications are
+    sent after the events commit, so one is skipped if a catch-up started
+    after it was sent.
+    """
+    caught_up_to = 0
+    
+    def events_appended(self, message):
+        if message['sent_at'] <= self.caught_up_to:
+            return
+        started = time.time()
+        catch_up_all()
+        self.caught_up_to = started
@@ -0,0 +1,132 @@
+"""Database routing between the primary and an optional read replica."""
+import contextvars
+import time
+from contextlib import contextmanager
+
+import redis
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, DatabaseError
+
+from smart_polling import metrics
+
+REPLICA_DB_ALIAS = 'replica'
+
+# Set for the duration of a request whose reads may be served by the replica.
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+# alias -> (checked_at, lag_seconds) measured by this process.
+_lag_cache = {}
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Allow reads inside the block to be routed to the replica."""
+    token = _replica_reads.set(enabled and replica_configured())
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _pin_key(poll_id, respondent):
+    return f'db-pin:{poll_id}:{respondent}'
+
+
+def pin_to_primary(poll_id, respondent):
+    """Send a respondent's reads for a poll to the primary for a short window.
+
+    Called after a write so the respondent's next read sees it, even if the
+    replica has not replayed the change yet.
+    """
+    if respondent and replica_configured():
+        try:
+            cache.set(_pin_key(poll_id, respondent), True, settings.REPLICA_PIN_SECONDS)
+        except redis.RedisError:
+            metrics.incr('replica.pin_failed')
+
+
+def is_pinned_to_primary(poll_id, respondent):
+    """Whether the respondent's reads must go to the primary; True if unknown."""
+    if not respondent or not replica_configured():
+        return False
+    try:
+        return bool(cache.get(_pin_key(poll_id, respondent)))
+    except redis.RedisError:
+        return True
+
+
+def _measure_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        # Nothing replicates to other databases (e.g. a SQLite copy of the
+        # primary); only check that it has the schema
+        table = apps.get_model('polls', 'Poll')._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM {connection.ops.quote_name(table)} LIMIT 1')
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN pg_is_in_recovery() THEN "
+            "COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+            "ELSE 0 END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def replica_lag(alias=REPLICA_DB_ALIAS):
+    """Return the replica's lag in seconds, or None if it cannot be reached.
+
+    The measurement is cached per process for REPLICA_LAG_CHECK_INTERVAL
+    seconds so routing does not add a query to every read.
+    """
+    now = time.monotonic()
+    checked_at, lag = _lag_cache.get(alias, (None, None))
+    if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return lag
+
+    try:
+        lag = _measure_lag(alias)
+    except DatabaseError:
+        lag = None
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def replica_healthy(alias=REPLICA_DB_ALIAS):
+    lag = replica_lag(alias)
+    return lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+
+class PrimaryReplicaRouter:
+    """Route opted-in reads to the replica, everything else to the primary.
+
+    Reads only go to the replica inside replica_reads(), outside of any
+    transaction on the primary, and while the replica's lag is within
+    REPLICA_MAX_LAG_SECONDS. Otherwise they fall back to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if not replica_healthy():
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A Postgres replica gets the schema through replication; this only
+        # matters for SQLite replicas set up with migrate --database replica
+        return db in (DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS)
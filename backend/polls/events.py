@@ -0,0 +1,74 @@
+"""Append-only submission event log, the source of the projections."""
+import logging
+import time
+
+import redis
+from asgiref.sync import async_to_sync
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from smart_polling import metrics
+
+from .models import SubmissionEvent
+
+logger = logging.getLogger(__name__)
+
+# Channel the projection worker (ProjectionConsumer) listens on
+PROJECTIONS_CHANNEL = 'projections'
+
+# Notifications are skipped until then after the channel layer was unreachable
+_channel_layer_down_until = 0
+
+
+def record_answers(respondent, answers, previous, complete, removed=()):
+    """Append an event for answers saved in the current transaction.
+    
+    previous maps question ids to the answer_data each answer replaced, so
+    projections can undo the old value without reading the Answer table.
+    Deleted answers (removed) are logged with answer_data None.
+    """
+    event = SubmissionEvent.objects.create(
+        poll_id=respondent.poll_id,
+        respondent=respondent,
+        event_type=SubmissionEvent.ANSWERS_SUBMITTED if complete else SubmissionEvent.ANSWERS_SAVED,
+        answers=[
+            {
+                'question_id': answer.question_id,
+                'answer_data': answer.answer_data,
+                'previous': previous.get(answer.question_id),
+            }
+            for answer in answers
+        ] + [
+            {'question_id': answer.question_id, 'answer_data': None, 'previous': answer.answer_data}
+            for answer in removed
+        ],
+    )
+    transaction.on_commit(notify_projections, robust=True)
+    return event
+
+
+def notify_projections():
+    """Wake the projection worker.
+    
+    Dropped notifications only delay projections: the worker catches up
+    from its stored offsets on the next one. While the channel layer is
+    unreachable, requests stop trying for PROJECTION_NOTIFY_RETRY_SECONDS.
+    """
+    global _channel_layer_down_until
+    if time.monotonic() < _channel_layer_down_until:
+        return
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.send)(
+            PROJECTIONS_CHANNEL, {'type': 'events.appended', 'sent_at': time.time()}
+        )
+    except ChannelFull:
+        pass
+    except (redis.RedisError, OSError) as exc:
+        metrics.incr('projections.notify_failed')
+        _channel_layer_down_until = time.monotonic() + settings.PROJECTION_NOTIFY_RETRY_SECONDS
+        logger.warning('Projection worker not notified, channel layer unreachable: %s', exc)
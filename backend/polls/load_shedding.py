@@ -0,0 +1,136 @@
+"""Priority load shedding driven by request queue latency."""
+import ipaddress
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from smart_polling import metrics
+
+# Load levels, in increasing order of severity
+NORMAL = 0
+SHED_READS = 1
+SHED_ALL = 2
+
+# Request priorities declared by views
+CRITICAL = 'critical'      # submissions and the participation flow
+DEGRADABLE = 'degradable'  # may be answered from cache when overloaded
+OPTIONAL = 'optional'      # rejected first
+
+
+class ServiceOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Service temporarily overloaded, please retry shortly.'
+    default_code = 'overloaded'
+    # Sent as Retry-After by DRF's exception handler
+    wait = 1
+
+
+class LoadMonitor:
+    """Exponentially weighted moving average of request queue latency.
+
+    Samples are capped at max_sample_factor times LOAD_SHED_ALL_LATENCY, so
+    one bogus measurement (clock skew, a forged header) cannot move the
+    average to SHED_ALL. One slow request can still lift it past
+    LOAD_SHED_READS_LATENCY, so shedding also needs min_slow_samples of the
+    last recent_samples to be over that threshold.
+    """
+
+    def __init__(self, alpha=0.2, max_sample_factor=2.0, min_slow_samples=3, recent_samples=5):
+        self.alpha = alpha
+        self.max_sample_factor = max_sample_factor
+        self.min_slow_samples = min_slow_samples
+        self.latency = 0.0
+        self.recent_slow = deque(maxlen=recent_samples)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        seconds = min(seconds, self.max_sample_factor * settings.LOAD_SHED_ALL_LATENCY)
+        with self._lock:
+            self.latency += self.alpha * (seconds - self.latency)
+            self.recent_slow.append(seconds >= settings.LOAD_SHED_READS_LATENCY)
+        metrics.observe('load_shedding.queue_latency', seconds)
+
+    def level(self):
+        if sum(self.recent_slow) < self.min_slow_samples:
+            return NORMAL
+        if self.latency >= settings.LOAD_SHED_ALL_LATENCY:
+            return SHED_ALL
+        if self.latency >= settings.LOAD_SHED_READS_LATENCY:
+            return SHED_READS
+        return NORMAL
+
+    def overloaded(self):
+        return self.level() >= SHED_READS
+
+
+monitor = LoadMonitor()
+
+
+def should_shed(priority, level):
+    if priority == CRITICAL:
+        return level >= SHED_ALL
+    return level >= SHED_READS
+
+
+def parse_request_start(value):
+    """Parse an X-Request-Start header ("t=1690000000.123") into epoch seconds."""
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    # Some proxies send milliseconds or microseconds
+    while started > 1e11:
+        started /= 1000
+    return started
+
+
+def is_trusted_proxy(address):
+    """Whether address is in LOAD_SHED_TRUSTED_PROXIES (IPs or CIDR ranges)."""
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.LOAD_SHED_TRUSTED_PROXIES
+    )
+
+
+# Requests under these paths don't feed the load monitor
+UNMONITORED_PATH_PREFIXES = ('/admin/',)
+
+
+class LoadSheddingMiddleware:
+    """Feed request queue latency into the load monitor.
+
+    Queue latency is read from the X-Request-Start header set by nginx, but
+    only on requests coming from LOAD_SHED_TRUSTED_PROXIES, since clients
+    reaching the backend directly could forge it. Otherwise the time spent
+    handling the request is used instead as a rougher saturation signal.
+    Admin pages are not measured, since they are slow without any load.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path.startswith(UNMONITORED_PATH_PREFIXES):
+            return self.get_response(request)
+        header = request.META.get('HTTP_X_REQUEST_START')
+        started = None
+        if header and is_trusted_proxy(request.META.get('REMOTE_ADDR', '')):
+            started = parse_request_start(header)
+        if started is not None:
+            monitor.observe(max(time.time() - started, 0))
+            return self.get_response(request)
+
+        handler_started = time.monotonic()
+        response = self.get_response(request)
+        monitor.observe(time.monotonic() - handler_started)
+        return response
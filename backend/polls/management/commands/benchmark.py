@@ -0,0 +1,244 @@
+import statistics
+import threading
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+
+from smart_polling import metrics
+from polls.models import Poll
+from polls.protocol import CODECS
+
+
+def build_answers(poll):
+    """Build a valid submission for a poll, following its conditional logic."""
+    answers = []
+    previous_answers = {}
+    for question in poll.questions.prefetch_related('choices'):
+        if not question.should_show(previous_answers):
+            continue
+        choices = list(question.choices.all())
+        if question.question_type == 'single_choice' and choices:
+            value = choices[0].id
+        elif question.question_type == 'multiple_choice' and choices:
+            value = [choices[0].id]
+        else:
+            value = 'benchmark'
+        answers.append({'question_id': question.id, 'answer_value': value})
+        previous_answers[question.id] = value
+    return answers
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency, query count and database connection cost of the hot '
+        'API paths, and the size and encoding cost of WebSocket poll updates. '
+        'With --max-queries or --max-p95-ms the command fails when an endpoint '
+        'exceeds its budget, e.g. against data from generate_synthetic_data.'
+    )
+
+    scenarios = ('results', 'submit', 'list', 'questions', 'websocket')
+    http_scenarios = ('results', 'submit', 'list', 'questions')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=int, help='Poll to benchmark against (HTTP scenarios).')
+        parser.add_argument('--requests', type=int, default=100, help='Requests or messages per scenario.')
+        parser.add_argument(
+            '--viewers', type=int, default=50000,
+            help='Connected viewers to extrapolate WebSocket bandwidth and CPU for.',
+        )
+        parser.add_argument(
+            '--scenario', choices=self.scenarios, action='append',
+            help='Scenario to run (repeatable). Defaults to all.',
+        )
+        parser.add_argument('--max-queries', type=int, help='Fail if any request makes more queries.')
+        parser.add_argument('--max-p95-ms', type=float, help='Fail if any scenario\'s p95 latency is higher.')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or self.scenarios
+        if 'websocket' in scenarios:
+            self.run_websocket(options['requests'], options['viewers'])
+
+        http_scenarios = [scenario for scenario in scenarios if scenario in self.http_scenarios]
+        if not http_scenarios:
+            return
+        if options['poll'] is None:
+            if options['scenario']:
+                raise CommandError('--poll is required for the results and submit scenarios')
+            return
+        try:
+            poll = Poll.objects.get(pk=options['poll'])
+        except Poll.DoesNotExist:
+            raise CommandError(f"Poll {options['poll']} does not exist")
+
+        # All requests come from one client, so don't let the rate limiter skew timings
+        failures = []
+        with override_settings(RATE_LIMIT_ENABLED=False):
+            for scenario in http_scenarios:
+                run = getattr(self, f'run_{scenario}')
+                result = run(poll, options['requests'])
+                self.report(scenario, result)
+                failures.extend(self.check_budgets(scenario, result, options))
+        if failures:
+            raise CommandError('Over budget: ' + '; '.join(failures))
+
+    def client(self):
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h and h != '*'), 'localhost')
+        return Client(HTTP_HOST=host)
+
+    def timed_requests(self, count, send):
+        """Send each request on its own thread, as Django does under ASGI."""
+        metrics.reset()
+        latencies = []
+        query_counts = []
+        responses = []
+
+        def worker():
+            queries = 0
+
+            def count_query(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            try:
+                with ExitStack() as stack:
+                    for alias in connections:
+                        stack.enter_context(connections[alias].execute_wrapper(count_query))
+                    started = time.perf_counter()
+                    responses.append(send(self.client()))
+                    latencies.append(time.perf_counter() - started)
+                query_counts.append(queries)
+            finally:
+                # The test client doesn't close connections when a request
+                # finishes; without this pooled connections are never released
+                connections.close_all()
+
+        for _ in range(count):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            response = responses[-1]
+            if response.status_code >= 400:
+                raise CommandError(f'Request failed with {response.status_code}: {response.content[:200]!r}')
+        return latencies, query_counts, metrics.snapshot()
+
+    def run_results(self, poll, count):
+        return self.timed_requests(count, lambda client: client.get(f'/api/polls/{poll.id}/results/'))
+
+    def run_submit(self, poll, count):
+        payload = {'answers': build_answers(poll)}
+        return self.timed_requests(
+            count,
+            lambda client: client.post(
+                f'/api/answers/submit/{poll.id}/', payload, content_type='application/json'
+            ),
+        )
+
+    def run_list(self, poll, count):
+        return self.timed_requests(count, lambda client: client.get('/api/polls/'))
+
+    def run_questions(self, poll, count):
+        return self.timed_requests(
+            count, lambda client: client.get(f'/api/participation/{poll.id}/questions/')
+        )
+
+    def run_websocket(self, count, viewers):
+        """Compare the WebSocket encodings for a stream of poll updates.
+
+        Every viewer's consumer encodes and sends each update, so per-message
+        costs are multiplied by the number of viewers. Compressed sizes use
+        one deflate stream per connection, as permessage-deflate does with
+        context takeover.
+        """
+        messages = [
+            {'type': 'poll_update', 'message': f'Poll updated: {i} new responses'}
+            for i in range(count)
+        ]
+        batch_size = settings.WS_BATCH_MAX_MESSAGES
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'websocket: {count} updates to {viewers} viewers'
+        ))
+
+        for name, codec in CODECS.items():
+            step = batch_size if codec.batched else 1
+            started = time.process_time()
+            frames = []
+            for i in range(0, count, step):
+                frames.extend(codec.encode(messages[i:i + step]))
+            cpu = time.process_time() - started
+
+            deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            raw_bytes = compressed_bytes = 0
+            for frame in frames:
+                data = frame if codec.binary else frame.encode()
+                raw_bytes += len(data)
+                compressed_bytes += len(deflate.compress(data) + deflate.flush(zlib.Z_SYNC_FLUSH)) - 4
+
+            self.stdout.write(
+                f'  {name}: {len(frames)} frames, '
+                f'{raw_bytes / count:.1f} B/msg ({compressed_bytes / count:.1f} B/msg deflated), '
+                f'{cpu / count * 1e6:.2f} us CPU/msg'
+            )
+            self.stdout.write(
+                f'    for {viewers} viewers: {raw_bytes * viewers / 1e6:.1f} MB '
+                f'({compressed_bytes * viewers / 1e6:.1f} MB deflated), '
+                f'{cpu * viewers:.2f} s CPU'
+            )
+
+    def p95(self, latencies):
+        latencies = sorted(latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def report(self, scenario, result):
+        latencies, query_counts, snapshot = result
+        if not latencies:
+            return
+        count = len(latencies)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{scenario}: {count} requests'))
+        self.stdout.write(
+            f'  latency mean {statistics.mean(latencies) * 1000:.2f} ms, '
+            f'p95 {self.p95(latencies) * 1000:.2f} ms'
+        )
+        self.stdout.write(f'  queries mean {statistics.mean(query_counts):.1f}, max {max(query_counts)}')
+
+        counters = snapshot['counters']
+        timings = snapshot['timings']
+        for alias in connections:
+            # connection_created also fires for pooled checkouts, so the pool's
+            # own counts show how many connections were really opened
+            pool_connects = timings.get(f'db.{alias}.pool.connect', {}).get('count', 0)
+            pool_reused = counters.get(f'db.{alias}.pool.reused', 0)
+            if pool_connects or pool_reused:
+                self.stdout.write(
+                    f'  db.{alias}: {pool_connects} connections opened, {pool_reused} reused from the pool '
+                    f'({pool_connects / count:.2f} opened per request)'
+                )
+            elif counters.get(f'db.{alias}.connections_opened'):
+                opened = counters[f'db.{alias}.connections_opened']
+                self.stdout.write(f'  db.{alias}: {opened} connections opened ({opened / count:.2f} per request)')
+        for name, value in sorted(counters.items()):
+            if name.startswith('db.') and not name.endswith(('.connections_opened', '.pool.reused')):
+                self.stdout.write(f'  {name}: {value} ({value / count:.2f} per request)')
+        for name, timing in sorted(snapshot['timings'].items()):
+            if name.startswith('db.'):
+                self.stdout.write(
+                    f"  {name}: avg {timing['avg_seconds'] * 1000:.3f} ms, "
+                    f"max {timing['max_seconds'] * 1000:.3f} ms over {timing['count']}"
+                )
+
+    def check_budgets(self, scenario, result, options):
+        latencies, query_counts, _ = result
+        failures = []
+        if not latencies:
+            return failures
+        if options['max_queries'] is not None and max(query_counts) > options['max_queries']:
+            failures.append(f"{scenario} made {max(query_counts)} queries (budget {options['max_queries']})")
+        p95_ms = self.p95(latencies) * 1000
+        if options['max_p95_ms'] is not None and p95_ms > options['max_p95_ms']:
+            failures.append(f"{scenario} p95 {p95_ms:.2f} ms (budget {options['max_p95_ms']:g} ms)")
+        return failures
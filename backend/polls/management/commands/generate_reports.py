@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Workers are spawned rather than forked so they never share database
+# sockets (including idle pooled connections) with this process. They
+# unpickle these functions before Django is set up, so models are only
+# imported inside them.
+
+def _init_worker():
+    django.setup()
+
+
+def _run_report(job):
+    from polls.reports import generate_poll_report
+    return generate_poll_report(*job)
+
+
+class Command(BaseCommand):
+    help = (
+        'Write JSON and CSV results reports for many polls using a pool of worker '
+        'processes. Polls whose report already exists are skipped, so an '
+        'interrupted run can simply be started again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory for poll_<id>.json and poll_<id>.csv files.')
+        parser.add_argument('--poll', type=int, action='append', dest='poll_ids', help='Poll to report on (repeatable).')
+        parser.add_argument('--include-open', action='store_true', help='Also report on polls that are still open.')
+        parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Worker processes.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Answers fetched per database round trip.')
+        parser.add_argument('--force', action='store_true', help='Regenerate reports that already exist.')
+
+    def handle(self, *args, **options):
+        from polls.models import Poll
+        from polls.reports import is_report_complete
+
+        if options['processes'] < 1:
+            raise CommandError('--processes must be at least 1')
+        output_dir = options['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+
+        polls = Poll.objects.order_by('id')
+        if options['poll_ids']:
+            polls = polls.filter(id__in=options['poll_ids'])
+        elif not options['include_open']:
+            polls = polls.filter(is_active=False)
+        poll_ids = list(polls.values_list('id', flat=True))
+
+        pending = [
+            poll_id for poll_id in poll_ids
+            if options['force'] or not is_report_complete(output_dir, poll_id)
+        ]
+        skipped = len(poll_ids) - len(pending)
+        if skipped:
+            self.stdout.write(f'Skipping {skipped} poll(s) with existing reports.')
+        if not pending:
+            self.stdout.write('Nothing to do.')
+            return
+
+        jobs = [(poll_id, output_dir, options['chunk_size']) for poll_id in pending]
+        processes = min(options['processes'], len(jobs))
+        self.stdout.write(f'Generating {len(jobs)} report(s) with {processes} process(es)...')
+
+        started = time.monotonic()
+        total_answers = 0
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(processes, initializer=_init_worker) as pool:
+            # chunksize=1 spreads polls across workers as they free up, so one
+            # huge poll doesn't hold back a batch of small ones
+            results = pool.imap_unordered(_run_report, jobs, chunksize=1)
+            for done, (poll_id, answers, seconds) in enumerate(results, 1):
+                total_answers += answers
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'[{done}/{len(jobs)}] poll {poll_id}: {answers} answers in {seconds:.2f}s '
+                    f'({done / elapsed:.1f} polls/s, {total_answers / elapsed:.0f} answers/s)'
+                )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(jobs)} report(s) with {total_answers} answers in {elapsed:.1f}s.'
+        ))
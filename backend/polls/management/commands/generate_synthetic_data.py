@@ -0,0 +1,209 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from polls.models import Poll, Question, Choice, Respondent, Answer, SubmissionEvent
+
+QUESTION_TYPES = ('single_choice', 'multiple_choice', 'text')
+QUESTION_TYPE_WEIGHTS = (5, 3, 2)
+OPERATORS = ('equals', 'not_equals', 'contains', 'not_contains')
+WORDS = (
+    'great', 'slow', 'easy', 'confusing', 'price', 'support', 'mobile', 'fast',
+    'design', 'bug', 'love', 'missing', 'feature', 'login', 'export', 'helpful',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create synthetic polls with mixed question types, conditional logic '
+        'chains using every operator, and respondents whose answers follow that '
+        'logic. The same --seed always produces the same polls and answers; run '
+        'it against a fresh database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--polls', type=int, default=10, help='Polls to create.')
+        parser.add_argument('--questions', type=int, default=10, help='Maximum questions per poll.')
+        parser.add_argument('--respondents', type=int, default=1000, help='Respondents per poll.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Answers written per bulk insert.')
+        parser.add_argument(
+            '--abandon-rate', type=float, default=0.1,
+            help='Fraction of respondents who stop partway and stay in progress.',
+        )
+        parser.add_argument('--creator', default='synthetic', help='Username that owns the polls.')
+        parser.add_argument(
+            '--question-types', default=','.join(QUESTION_TYPES),
+            help='Comma-separated question types to generate; must include single_choice.',
+        )
+
+    def handle(self, *args, **options):
+        if options['questions'] < 1:
+            raise CommandError('--questions must be at least 1')
+        question_types = [t.strip() for t in options['question_types'].split(',') if t.strip()]
+        unknown = set(question_types) - set(QUESTION_TYPES)
+        if unknown:
+            raise CommandError(f"Unknown question type(s): {', '.join(sorted(unknown))}")
+        # The first question of every poll is single choice so others can depend on it
+        if 'single_choice' not in question_types:
+            raise CommandError('--question-types must include single_choice')
+        weights = [w for t, w in zip(QUESTION_TYPES, QUESTION_TYPE_WEIGHTS) if t in question_types]
+        question_types = [t for t in QUESTION_TYPES if t in question_types]
+        creator, _ = User.objects.get_or_create(username=options['creator'])
+
+        started = time.monotonic()
+        total_answers = 0
+        for index in range(options['polls']):
+            # One generator per poll, so a poll's contents don't depend on the others
+            rng = random.Random(f"{options['seed']}:{index}")
+            poll, questions = self.create_poll(
+                rng, index, creator, options['questions'], question_types, weights,
+            )
+            answers = self.create_responses(
+                rng, poll, questions, options['respondents'],
+                options['batch_size'], options['abandon_rate'],
+            )
+            total_answers += answers
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"[{index + 1}/{options['polls']}] poll {poll.id}: {len(questions)} questions, "
+                f"{options['respondents']} respondents, {answers} answers "
+                f"({total_answers / elapsed:.0f} answers/s)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {options['polls']} poll(s) with {total_answers} answers "
+            f"in {time.monotonic() - started:.1f}s."
+        ))
+
+    def create_poll(self, rng, index, creator, max_questions, question_types, weights):
+        poll = Poll.objects.create(
+            title=f'Synthetic poll {index + 1}',
+            description='Generated by generate_synthetic_data.',
+            creator=creator,
+        )
+        question_count = rng.randint(max(1, max_questions // 2), max_questions)
+        questions = []
+        for order in range(question_count):
+            # Start with a choice question so later ones have something to depend on
+            question_type = 'single_choice' if order == 0 else rng.choices(
+                question_types, weights=weights
+            )[0]
+            question = Question(
+                poll=poll,
+                text=f'Question {order + 1}',
+                question_type=question_type,
+                order=order,
+                is_required=rng.random() < 0.7,
+            )
+            self.add_condition(rng, question, questions)
+            question.save()
+
+            question.choice_ids = []
+            if question_type != 'text':
+                choices = Choice.objects.bulk_create(
+                    Choice(question=question, text=f'Option {i + 1}', order=i)
+                    for i in range(rng.randint(2, 6))
+                )
+                question.choice_ids = [choice.id for choice in choices]
+            questions.append(question)
+        return poll, questions
+
+    def add_condition(self, rng, question, previous_questions):
+        """Make the question depend on an earlier one.
+
+        Each poll uses the operators in turn, so with five or more questions
+        every operator appears. Equality conditions target single choice
+        questions (whose answer is one choice id), containment conditions any
+        choice question.
+        """
+        used = sum(1 for q in previous_questions if q.depends_on_question is not None)
+        if not previous_questions or (used >= len(OPERATORS) and rng.random() >= 0.3):
+            return
+        operator = OPERATORS[used % len(OPERATORS)]
+        if operator in ('equals', 'not_equals'):
+            candidates = [q for q in previous_questions if q.question_type == 'single_choice']
+        else:
+            candidates = [q for q in previous_questions if q.question_type != 'text']
+        # Prefer the latest candidate to build chains of dependent questions
+        parent = candidates[-1] if rng.random() < 0.6 else rng.choice(candidates)
+        question.depends_on_question = parent
+        question.condition_operator = operator
+        question.condition_value = str(rng.choice(parent.choice_ids))
+
+    def answer_value(self, rng, question):
+        if question.question_type == 'single_choice':
+            # Skew towards earlier options, like real polls
+            weights = [1 / (i + 1) for i in range(len(question.choice_ids))]
+            return rng.choices(question.choice_ids, weights=weights)[0]
+        if question.question_type == 'multiple_choice':
+            return sorted(rng.sample(question.choice_ids, rng.randint(1, len(question.choice_ids))))
+        return ' '.join(rng.choices(WORDS, k=rng.randint(1, 6)))
+
+    def plan_response(self, rng, questions, abandon_rate):
+        """Return (complete, [(question, value), ...]) for one respondent."""
+        stop_at = rng.randrange(len(questions)) if rng.random() < abandon_rate else None
+        previous_answers = {}
+        planned = []
+        for position, question in enumerate(questions):
+            if position == stop_at:
+                break
+            if not question.should_show(previous_answers):
+                continue
+            if not question.is_required and rng.random() < 0.2:
+                continue
+            value = self.answer_value(rng, question)
+            previous_answers[question.id] = value
+            planned.append((question, value))
+        return stop_at is None, planned
+
+    def create_responses(self, rng, poll, questions, respondent_count, batch_size, abandon_rate):
+        per_batch = max(1, batch_size // len(questions))
+        now = timezone.now()
+        answer_count = 0
+        for batch_start in range(0, respondent_count, per_batch):
+            respondents = []
+            plans = []
+            for _ in range(min(per_batch, respondent_count - batch_start)):
+                complete, planned = self.plan_response(rng, questions, abandon_rate)
+                respondents.append(Respondent(
+                    poll=poll,
+                    session_id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                    status=Respondent.COMPLETE if complete else Respondent.IN_PROGRESS,
+                    completed_at=now if complete else None,
+                ))
+                plans.append(planned)
+
+            with transaction.atomic():
+                Respondent.objects.bulk_create(respondents)
+                answers = []
+                events = []
+                for respondent, planned in zip(respondents, plans):
+                    respondent_answers = []
+                    for question, value in planned:
+                        answer = Answer(poll=poll, question=question, respondent=respondent)
+                        answer.answer_value = value
+                        respondent_answers.append(answer)
+                    answers.extend(respondent_answers)
+                    # Log the answers too, so projections can be built from this data
+                    events.append(SubmissionEvent(
+                        poll=poll,
+                        respondent=respondent,
+                        event_type=(
+                            SubmissionEvent.ANSWERS_SUBMITTED if respondent.is_complete
+                            else SubmissionEvent.ANSWERS_SAVED
+                        ),
+                        answers=[
+                            {'question_id': answer.question_id, 'answer_data': answer.answer_data, 'previous': None}
+                            for answer in respondent_answers
+                        ],
+                    ))
+                Answer.objects.bulk_create(answers, batch_size=batch_size)
+                SubmissionEvent.objects.bulk_create(events, batch_size=batch_size)
+            answer_count += len(answers)
+        return answer_count
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.projections import PROJECTIONS
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild projections of the submission event log from scratch, or with '
+        '--catch-up apply only the events past their stored offsets.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*', metavar='name',
+            help=f"Projections to process: {', '.join(sorted(PROJECTIONS))}. Defaults to all.",
+        )
+        parser.add_argument('--catch-up', action='store_true', help='Apply new events instead of rebuilding.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(PROJECTIONS)
+        if unknown:
+            raise CommandError(f"Unknown projection(s): {', '.join(sorted(unknown))}")
+        for name in options['names'] or PROJECTIONS:
+            projection = PROJECTIONS[name]
+            started = time.monotonic()
+            applied = projection.catch_up() if options['catch_up'] else projection.rebuild()
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: applied {applied} events in {elapsed:.1f}s '
+                f'({applied / elapsed if elapsed else 0:.0f} events/s)'
+            ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from polls.scheduler import ExpiryScheduler
+
+
+class Command(BaseCommand):
+    help = 'Close polls at their expiry deadline and freeze their results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--refresh-interval', type=float, default=30,
+            help='Seconds between reloads of upcoming deadlines from the database.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Close the polls that are already past their deadline and exit.',
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ExpiryScheduler(refresh_interval=options['refresh_interval'])
+
+        if options['once']:
+            scheduler.load()
+            self.report(scheduler.close_due())
+            return
+
+        self.stdout.write('Poll scheduler running. Press CTRL+C to stop.')
+        try:
+            scheduler.run(on_close=self.report)
+        except KeyboardInterrupt:
+            pass
+
+    def report(self, poll_ids):
+        if poll_ids:
+            self.stdout.write(f"Closed {len(poll_ids)} poll(s): {', '.join(map(str, poll_ids))}")
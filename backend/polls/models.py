@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 import json
+import uuid
 
 
 class Poll(models.Model):
@@ -11,8 +12,17 @@ class Poll(models.Model):
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_polls')
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(null=True, blank=True)
-    is_active = models.BooleanField(default=True)
+    # Flipped to False by the expiry scheduler at expires_at
+    is_active = models.BooleanField(default=True, db_index=True)
     allow_anonymous = models.BooleanField(default=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    # Results frozen when the poll was closed
+    final_results = models.JSONField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'expires_at']),
+        ]
     
     def __str__(self):
         return self.title
@@ -23,6 +33,15 @@ class Poll(models.Model):
             from django.utils import timezone
             return timezone.now() > self.expires_at
         return False
+    
+    @property
+    def is_open(self):
+        """Whether the poll accepts answers.
+        
+        Checks the deadline too, so polls still close on time where the
+        expiry scheduler isn't running.
+        """
+        return self.is_active and not self.is_expired
 
 
 class Question(models.Model):
@@ -49,7 +68,7 @@ class Question(models.Model):
     )
     condition_value = models.CharField(max_length=200, blank=True)
     condition_operator = models.CharField(
-        max_length=10,
+        max_length=12,
         choices=[
             ('equals', 'Equals'),
             ('not_equals', 'Not Equals'),
@@ -75,13 +94,13 @@ class Question(models.Model):
     
     def should_show(self, previous_answers):
         """Determine if this question should be shown based on previous answers."""
-        if not self.depends_on_question:
+        if not self.depends_on_question_id:
             return True
         
-        if self.depends_on_question.id not in previous_answers:
+        if self.depends_on_question_id not in previous_answers:
             return False
         
-        answer_value = previous_answers[self.depends_on_question.id]
+        answer_value = previous_answers[self.depends_on_question_id]
         
         if self.condition_operator == 'equals':
             return str(answer_value) == self.condition_value
@@ -108,19 +127,70 @@ class Choice(models.Model):
         return self.text
 
 
+class Respondent(models.Model):
+    """One person taking a poll: a user, or an anonymous session."""
+    IN_PROGRESS = 'in_progress'
+    COMPLETE = 'complete'
+    STATUSES = [
+        (IN_PROGRESS, 'In Progress'),
+        (COMPLETE, 'Complete'),
+    ]
+    
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name='respondents')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Handed to anonymous clients to resume their response
+    session_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    status = models.CharField(max_length=12, choices=STATUSES, default=IN_PROGRESS)
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['poll', 'user'],
+                condition=models.Q(user__isnull=False),
+                name='unique_respondent_per_user',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['poll', 'status']),
+        ]
+    
+    def __str__(self):
+        respondent = self.user.username if self.user_id else f"Anonymous ({self.session_id})"
+        return f"{respondent} - {self.poll.title}"
+    
+    @property
+    def is_complete(self):
+        return self.status == self.COMPLETE
+
+
 class Answer(models.Model):
     """Answer model to store user responses."""
     poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name='answers')
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers')
+    respondent = models.ForeignKey(Respondent, on_delete=models.CASCADE, related_name='answers')
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
-    session_id = models.CharField(max_length=100, blank=True)  # For anonymous users
     
     # Store answer data as JSON to handle different question types
     answer_data = models.JSONField()
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        constraints = [
+            # One answer per question; later saves overwrite it (upserts)
+            models.UniqueConstraint(
+                fields=['respondent', 'question'],
+                name='unique_answer_per_question',
+            ),
+        ]
+        indexes = [
+            # Streams a poll's answers grouped by respondent (bulk reports)
+            models.Index(fields=['poll', 'respondent']),
+        ]
+    
     def __str__(self):
-        user_info = self.user.username if self.user else f"Anonymous ({self.session_id})"
+        user_info = self.user.username if self.user else f"Anonymous ({self.respondent_id})"
         return f"{user_info} - {self.question.text}"
     
     def get_answer_value(self):
@@ -145,3 +215,78 @@ class Answer(models.Model):
             self.answer_data = {'value': value}
     
     answer_value = property(get_answer_value, set_answer_value)
+
+
+class SubmissionEvent(models.Model):
+    """Append-only log of saved answers; the id is the event's offset.
+    
+    Written in the same transaction as the answers, and consumed by the
+    projections in polls/projections.py.
+    """
+    ANSWERS_SAVED = 'answers_saved'
+    ANSWERS_SUBMITTED = 'answers_submitted'
+    EVENT_TYPES = [
+        (ANSWERS_SAVED, 'Answers Saved'),
+        (ANSWERS_SUBMITTED, 'Answers Submitted'),
+    ]
+    
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name='events')
+    respondent = models.ForeignKey(Respondent, on_delete=models.CASCADE, related_name='events')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    # [{"question_id": ..., "answer_data": ..., "previous": answer_data or null}]
+    answers = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.event_type} #{self.id} ({self.respondent_id})"
+
+
+class ProjectionOffset(models.Model):
+    """The last event a projection has applied.
+    
+    gaps maps lower event ids that were missing when position passed them
+    to the time they were first seen missing.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    gaps = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class ResultTally(models.Model):
+    """Projected answer count per question option.
+    
+    The option is a choice id, or '' counting responses to a text question.
+    """
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name='tallies')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='tallies')
+    option = models.CharField(max_length=50, blank=True)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'option'], name='unique_tally_option'),
+        ]
+    
+    def __str__(self):
+        return f"{self.question_id}:{self.option} = {self.count}"
+
+
+class RespondentProgress(models.Model):
+    """Projected progress of one respondent through a poll."""
+    respondent = models.OneToOneField(
+        Respondent, on_delete=models.CASCADE, primary_key=True, related_name='progress'
+    )
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name='respondent_progress')
+    answered = models.PositiveIntegerField(default=0)
+    complete = models.BooleanField(default=False)
+    last_event_id = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.respondent_id}: {self.answered} answered"
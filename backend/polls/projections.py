@@ -0,0 +1,180 @@
+"""
+Read models built from the submission event log.
+
+Each projection consumes SubmissionEvent rows in id order, starting after
+the offset stored in ProjectionOffset. A batch of events and the new offset
+are saved in one transaction, so no event is applied twice, and a projection
+can be rebuilt from scratch by resetting it to offset 0.
+
+Event ids are assigned before the inserting transaction commits, so an
+event can become visible after one with a higher id. Ids the offset moves
+past without seeing are kept as gaps and read again on every catch-up.
+A gap still empty after PROJECTION_GAP_SECONDS is taken to be a rolled back
+insert and dropped; an event committing later than that is never applied.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import SubmissionEvent, ProjectionOffset, ResultTally, RespondentProgress, Question
+
+
+def tally_options(answer_data):
+    """Options an answer counts towards: its choice ids, or '' for a text answer."""
+    if not answer_data:
+        return []
+    if 'choice_id' in answer_data:
+        return [str(answer_data['choice_id'])]
+    if 'choice_ids' in answer_data:
+        return sorted({str(choice_id) for choice_id in answer_data['choice_ids']})
+    return ['']
+
+
+class Projection:
+    """Base class for projections of the submission event log.
+    
+    Subclasses set name and implement apply() for a batch of events and
+    reset() to delete their state before a rebuild.
+    """
+    name = None
+    batch_size = 1000
+    
+    def apply(self, events):
+        raise NotImplementedError
+    
+    def reset(self):
+        raise NotImplementedError
+    
+    def catch_up(self):
+        """Apply events past the stored offset or in its gaps; returns how many were applied."""
+        applied = 0
+        while True:
+            with transaction.atomic():
+                # The row lock keeps concurrent workers from applying a batch twice
+                offset, _ = ProjectionOffset.objects.select_for_update().get_or_create(name=self.name)
+                events = list(
+                    SubmissionEvent.objects
+                    .filter(Q(id__gt=offset.position) | Q(id__in=[int(event_id) for event_id in offset.gaps]))
+                    .order_by('id')[:self.batch_size]
+                )
+                gaps = self.track_gaps(offset, events)
+                if events:
+                    self.apply(events)
+                    offset.position = max(offset.position, events[-1].id)
+                if events or gaps != offset.gaps:
+                    offset.gaps = gaps
+                    offset.save(update_fields=['position', 'gaps', 'updated_at'])
+                if not events:
+                    return applied
+            applied += len(events)
+    
+    def track_gaps(self, offset, events):
+        """Return the offset's gaps after applying events.
+        
+        Gaps the events fill or that have expired are dropped, and ids the
+        events skip past the current position are added, unless the event
+        after them is older than PROJECTION_GAP_SECONDS (as when rebuilding).
+        """
+        now = time.time()
+        seen = {event.id for event in events}
+        gaps = {
+            event_id: missing_since for event_id, missing_since in offset.gaps.items()
+            if int(event_id) not in seen and now - missing_since < settings.PROJECTION_GAP_SECONDS
+        }
+        last_id = offset.position
+        for event in events:
+            if event.id <= last_id:
+                continue
+            if now - event.created_at.timestamp() < settings.PROJECTION_GAP_SECONDS:
+                gaps.update((str(event_id), now) for event_id in range(last_id + 1, event.id))
+            last_id = event.id
+        return gaps
+    
+    def rebuild(self):
+        """Delete the projection's state and replay the whole log."""
+        with transaction.atomic():
+            offset, _ = ProjectionOffset.objects.select_for_update().get_or_create(name=self.name)
+            self.reset()
+            offset.position = 0
+            offset.gaps = {}
+            offset.save(update_fields=['position', 'gaps', 'updated_at'])
+        return self.catch_up()
+
+
+class ResultTallyProjection(Projection):
+    """Answer counts per question option (ResultTally)."""
+    name = 'result_tallies'
+    
+    def apply(self, events):
+        deltas = Counter()
+        for event in events:
+            for answer in event.answers:
+                key = (event.poll_id, answer['question_id'])
+                for option in tally_options(answer['previous']):
+                    deltas[key + (option,)] -= 1
+                for option in tally_options(answer['answer_data']):
+                    deltas[key + (option,)] += 1
+        
+        # Skip questions deleted since the event was written
+        question_ids = set(Question.objects.filter(
+            id__in={question_id for _, question_id, _ in deltas}
+        ).values_list('id', flat=True))
+        deltas = {key: delta for key, delta in deltas.items() if delta and key[1] in question_ids}
+        
+        ResultTally.objects.bulk_create(
+            [
+                ResultTally(poll_id=poll_id, question_id=question_id, option=option)
+                for poll_id, question_id, option in deltas
+            ],
+            ignore_conflicts=True,
+        )
+        for (_, question_id, option), delta in deltas.items():
+            ResultTally.objects.filter(question_id=question_id, option=option).update(
+                count=F('count') + delta
+            )
+    
+    def reset(self):
+        ResultTally.objects.all().delete()
+
+
+class RespondentProgressProjection(Projection):
+    """Questions answered and completion per respondent (RespondentProgress)."""
+    name = 'respondent_progress'
+    
+    def apply(self, events):
+        progress = RespondentProgress.objects.in_bulk({event.respondent_id for event in events})
+        for event in events:
+            state = progress.get(event.respondent_id)
+            if state is None:
+                state = progress[event.respondent_id] = RespondentProgress(
+                    respondent_id=event.respondent_id, poll_id=event.poll_id
+                )
+            for answer in event.answers:
+                # Count new answers and uncount removed ones; overwrites change nothing
+                state.answered += (answer['answer_data'] is not None) - (answer['previous'] is not None)
+            state.complete = state.complete or event.event_type == SubmissionEvent.ANSWERS_SUBMITTED
+            state.last_event_id = event.id
+        
+        RespondentProgress.objects.bulk_create(
+            progress.values(),
+            update_conflicts=True,
+            unique_fields=['respondent'],
+            update_fields=['answered', 'complete', 'last_event_id'],
+        )
+    
+    def reset(self):
+        RespondentProgress.objects.all().delete()
+
+
+PROJECTIONS = {
+    projection.name: projection
+    for projection in (ResultTallyProjection(), RespondentProgressProjection())
+}
+
+
+def catch_up_all():
+    """Bring every projection up to date; returns {name: events applied}."""
+    return {name: projection.catch_up() for name, projection in PROJECTIONS.items()}
@@ -0,0 +1,82 @@
+"""
+Wire protocol for the ``ws/polls/<id>/`` consumer.
+
+Clients pick an encoding through the WebSocket subprotocol header:
+
+- ``polls.v1.json`` (also used when no subprotocol is requested): one
+  verbose JSON object per text frame, e.g. ``{"type": "poll_update", ...}``.
+- ``polls.v2.compact``: batched JSON text frames. A frame is
+  ``[2, [message, ...]]`` where each message is ``[type_code, *fields]``
+  with fields in the order listed in MESSAGE_FIELDS.
+- ``polls.v2.msgpack``: the same structure as v2 compact, sent as a
+  MessagePack binary frame.
+"""
+import json
+
+import msgpack
+
+PROTOCOL_VERSION = 2
+
+# Numeric type codes and positional fields used by the v2 encodings
+MESSAGE_TYPES = {
+    'poll_update': 1,
+    'poll_closed': 2,
+}
+MESSAGE_FIELDS = {
+    'poll_update': ('message',),
+    'poll_closed': ('poll_id', 'closed_at'),
+}
+
+
+def compact_message(message):
+    """Turn a message dict into its positional v2 form."""
+    message_type = message['type']
+    return [MESSAGE_TYPES[message_type]] + [message[field] for field in MESSAGE_FIELDS[message_type]]
+
+
+class JsonCodec:
+    """Legacy verbose JSON, one message per frame."""
+    subprotocol = 'polls.v1.json'
+    binary = False
+    batched = False
+
+    def encode(self, messages):
+        return [json.dumps(message) for message in messages]
+
+
+class CompactCodec:
+    """Batched positional JSON."""
+    subprotocol = 'polls.v2.compact'
+    binary = False
+    batched = True
+
+    def encode(self, messages):
+        frame = [PROTOCOL_VERSION, [compact_message(message) for message in messages]]
+        return [json.dumps(frame, separators=(',', ':'))]
+
+
+class MsgpackCodec:
+    """Batched positional MessagePack."""
+    subprotocol = 'polls.v2.msgpack'
+    binary = True
+    batched = True
+
+    def encode(self, messages):
+        frame = [PROTOCOL_VERSION, [compact_message(message) for message in messages]]
+        return [msgpack.packb(frame)]
+
+
+CODECS = {codec.subprotocol: codec for codec in (JsonCodec(), CompactCodec(), MsgpackCodec())}
+DEFAULT_CODEC = CODECS[JsonCodec.subprotocol]
+
+
+def negotiate(requested_subprotocols):
+    """Return (codec, subprotocol to accept) for the client's offered subprotocols.
+
+    The first supported subprotocol in the client's order of preference wins.
+    Clients that offer none get the legacy JSON encoding and no subprotocol.
+    """
+    for subprotocol in requested_subprotocols:
+        if subprotocol in CODECS:
+            return CODECS[subprotocol], subprotocol
+    return DEFAULT_CODEC, None
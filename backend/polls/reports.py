@@ -0,0 +1,194 @@
+"""Bulk results reports computed from streamed answers."""
+import csv
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from itertools import combinations, groupby
+from operator import itemgetter
+
+from django.db.models import Count, Q
+
+from .models import Poll, Answer, Respondent
+
+CHOICE_TYPES = ('single_choice', 'multiple_choice')
+TEXT_SAMPLE_SIZE = 10
+
+
+def report_paths(output_dir, poll_id):
+    return (
+        os.path.join(output_dir, f'poll_{poll_id}.json'),
+        os.path.join(output_dir, f'poll_{poll_id}.csv'),
+    )
+
+
+def is_report_complete(output_dir, poll_id):
+    """The JSON file is written last, so its presence marks a finished report."""
+    return os.path.exists(report_paths(output_dir, poll_id)[0])
+
+
+def _choice_ids(question_type, answer_data):
+    if question_type == 'single_choice':
+        values = [answer_data.get('choice_id')]
+    else:
+        values = answer_data.get('choice_ids') or []
+    choice_ids = set()
+    for value in values:
+        try:
+            choice_ids.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return choice_ids
+
+
+class PollReport:
+    """Aggregate a poll's answers one respondent at a time.
+
+    Besides per-question totals it builds crosstabs between every pair of
+    choice questions: how many respondents picked each combination of choices.
+    """
+
+    def __init__(self, poll):
+        self.poll = poll
+        self.questions = list(poll.questions.prefetch_related('choices'))
+        self.question_types = {question.id: question.question_type for question in self.questions}
+        self.choice_counts = defaultdict(Counter)
+        self.total_responses = Counter()
+        self.text_samples = defaultdict(list)
+        self.crosstabs = defaultdict(Counter)
+        self.answer_count = 0
+
+    def add_respondent(self, answers):
+        """Add one respondent's answers, given as (question_id, answer_data) pairs."""
+        selected = {}
+        for question_id, answer_data in answers:
+            question_type = self.question_types.get(question_id)
+            if question_type is None:
+                continue
+            self.answer_count += 1
+            self.total_responses[question_id] += 1
+
+            if question_type in CHOICE_TYPES:
+                choice_ids = _choice_ids(question_type, answer_data or {})
+                self.choice_counts[question_id].update(choice_ids)
+                selected.setdefault(question_id, set()).update(choice_ids)
+            elif question_type == 'text':
+                samples = self.text_samples[question_id]
+                if len(samples) < TEXT_SAMPLE_SIZE:
+                    samples.append((answer_data or {}).get('text', ''))
+
+        for first, second in combinations(sorted(selected), 2):
+            crosstab = self.crosstabs[(first, second)]
+            for first_choice in selected[first]:
+                for second_choice in selected[second]:
+                    crosstab[(first_choice, second_choice)] += 1
+
+    def question_results(self):
+        results = []
+        for question in self.questions:
+            if question.question_type in CHOICE_TYPES:
+                counts = self.choice_counts[question.id]
+                question_results = {choice.text: counts[choice.id] for choice in question.choices.all()}
+            elif question.question_type == 'text':
+                question_results = {'sample_responses': self.text_samples[question.id]}
+            else:
+                question_results = {}
+            results.append({
+                'question_id': question.id,
+                'question_text': question.text,
+                'question_type': question.question_type,
+                'results': question_results,
+                'total_responses': self.total_responses[question.id],
+            })
+        return results
+
+    def crosstab_results(self):
+        choice_text = {
+            choice.id: choice.text
+            for question in self.questions
+            for choice in question.choices.all()
+        }
+        return [
+            {
+                'question_ids': [first, second],
+                'counts': [
+                    {
+                        'choices': [choice_text.get(first_choice), choice_text.get(second_choice)],
+                        'count': count,
+                    }
+                    for (first_choice, second_choice), count in sorted(crosstab.items())
+                ],
+            }
+            for (first, second), crosstab in sorted(self.crosstabs.items())
+        ]
+
+    def as_dict(self, respondent_counts):
+        return {
+            'poll_id': self.poll.id,
+            'poll_title': self.poll.title,
+            'closed_at': self.poll.closed_at.isoformat() if self.poll.closed_at else None,
+            'respondents': respondent_counts['respondents'],
+            'completed': respondent_counts['completed'],
+            'results': self.question_results(),
+            'crosstabs': self.crosstab_results(),
+        }
+
+    def write_csv(self, path, results):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['question_id', 'question_text', 'question_type', 'option', 'count'])
+            for question in results:
+                if question['question_type'] == 'text':
+                    writer.writerow([
+                        question['question_id'], question['question_text'],
+                        question['question_type'], '', question['total_responses']
+                    ])
+                    continue
+                for option, count in question['results'].items():
+                    writer.writerow([
+                        question['question_id'], question['question_text'],
+                        question['question_type'], option, count
+                    ])
+
+
+def _write_atomic(path, write):
+    tmp_path = f'{path}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def generate_poll_report(poll_id, output_dir, chunk_size=5000):
+    """Compute and write one poll's JSON and CSV report.
+
+    Answers are streamed in respondent order with a server-side cursor, so
+    memory use does not grow with the number of answers. Returns
+    (poll_id, answers processed, seconds taken).
+    """
+    started = time.monotonic()
+    poll = Poll.objects.get(pk=poll_id)
+    report = PollReport(poll)
+
+    rows = (
+        Answer.objects.filter(poll_id=poll_id)
+        .order_by('respondent_id')
+        .values_list('respondent_id', 'question_id', 'answer_data')
+        .iterator(chunk_size=chunk_size)
+    )
+    for _, respondent_rows in groupby(rows, key=itemgetter(0)):
+        report.add_respondent((question_id, answer_data) for _, question_id, answer_data in respondent_rows)
+
+    respondent_counts = Respondent.objects.filter(poll_id=poll_id).aggregate(
+        respondents=Count('id'),
+        completed=Count('id', filter=Q(status=Respondent.COMPLETE))
+    )
+    data = report.as_dict(respondent_counts)
+
+    json_path, csv_path = report_paths(output_dir, poll_id)
+    _write_atomic(csv_path, lambda path: report.write_csv(path, data['results']))
+
+    def write_json(path):
+        with open(path, 'w') as f:
+            json.dump(data, f)
+    _write_atomic(json_path, write_json)
+
+    return poll_id, report.answer_count, time.monotonic() - started
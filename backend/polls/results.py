@@ -0,0 +1,95 @@
+import time
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from smart_polling import metrics
+
+from .serializers import PollResultsSerializer
+
+# Raised by the Redis cache backend while Redis is unreachable
+CACHE_ERRORS = (redis.RedisError,)
+
+
+CHOICE_LOOKUPS = {
+    'single_choice': 'answer_data__choice_id',
+    'multiple_choice': 'answer_data__choice_ids__contains',
+}
+
+
+def get_question_results(question):
+    """Calculate results for a specific question."""
+    answers = question.answers.all()
+    
+    if question.question_type in CHOICE_LOOKUPS:
+        # One query counts every choice
+        lookup = CHOICE_LOOKUPS[question.question_type]
+        choices = list(question.choices.all())
+        counts = answers.aggregate(
+            total_responses=Count('id'),
+            **{f'choice_{choice.id}': Count('id', filter=Q(**{lookup: choice.id})) for choice in choices}
+        )
+        return PollResultsSerializer({
+            'question_id': question.id,
+            'question_text': question.text,
+            'question_type': question.question_type,
+            'results': {choice.text: counts[f'choice_{choice.id}'] for choice in choices},
+            'total_responses': counts['total_responses']
+        }).data
+    
+    total_responses = answers.count()
+    if question.question_type == 'text':
+        # For text questions, return sample responses
+        text_answers = answers.values_list('answer_data__text', flat=True)[:10]
+        return PollResultsSerializer({
+            'question_id': question.id,
+            'question_text': question.text,
+            'question_type': question.question_type,
+            'results': {'sample_responses': list(text_answers)},
+            'total_responses': total_responses
+        }).data
+    
+    return PollResultsSerializer({
+        'question_id': question.id,
+        'question_text': question.text,
+        'question_type': question.question_type,
+        'results': {},
+        'total_responses': total_responses
+    }).data
+
+
+def get_poll_results(poll):
+    """Calculate aggregated results for every question of a poll."""
+    return [get_question_results(question) for question in poll.questions.prefetch_related('choices')]
+
+
+def results_cache_key(poll_id):
+    return f'poll-results:{poll_id}'
+
+
+def cache_poll_results(poll_id, results):
+    """Cache results; they stay available as stale data for RESULTS_STALE_SECONDS."""
+    try:
+        cache.set(results_cache_key(poll_id), (time.time(), results), settings.RESULTS_STALE_SECONDS)
+    except CACHE_ERRORS:
+        metrics.incr('results.cache_unavailable')
+
+
+def get_cached_poll_results(poll_id, max_age=None):
+    """Return cached results no older than max_age seconds (any age if None).
+    
+    Raises one of CACHE_ERRORS while the cache is unreachable.
+    """
+    cached = cache.get(results_cache_key(poll_id))
+    if cached is None:
+        return None
+    computed_at, results = cached
+    if max_age is not None and time.time() - computed_at > max_age:
+        return None
+    return results
+
+
+def invalidate_poll_results(poll_id):
+    cache.delete(results_cache_key(poll_id))
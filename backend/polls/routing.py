@@ -1,6 +1,12 @@
 from django.urls import re_path
 from . import consumers
+from .events import PROJECTIONS_CHANNEL
 
 websocket_urlpatterns = [
     re_path(r'ws/polls/(?P<poll_id>\w+)/$', consumers.PollConsumer.as_asgi()),
 ]
+
+# Background channels, served by `manage.py runworker <channel>`
+channel_routes = {
+    PROJECTIONS_CHANNEL: consumers.ProjectionConsumer.as_asgi(),
+}
@@ -0,0 +1,119 @@
+import heapq
+import logging
+import time
+from datetime import timedelta
+
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Poll
+from .results import get_poll_results
+from .signals import poll_closed
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before retrying after a database error
+DATABASE_RETRY_SECONDS = 5
+
+
+def send_poll_closed(poll):
+    """Send poll_closed, logging failed receivers so the others still run."""
+    for receiver, result in poll_closed.send_robust(sender=Poll, poll=poll):
+        if isinstance(result, Exception):
+            logger.warning('poll_closed receiver %s failed for poll %s: %s', receiver.__name__, poll.id, result)
+
+
+def close_poll(poll_id, now=None):
+    """Close a poll whose deadline has passed.
+
+    Freezes its results into ``final_results``, marks it inactive and sends
+    ``poll_closed`` once the transaction commits. Returns False if the poll
+    is already closed or its deadline has moved into the future.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        poll = (
+            Poll.objects.select_for_update()
+            .filter(pk=poll_id, is_active=True, expires_at__lte=now)
+            .first()
+        )
+        if poll is None:
+            return False
+        
+        poll.final_results = get_poll_results(poll)
+        poll.is_active = False
+        poll.closed_at = now
+        poll.save(update_fields=['final_results', 'is_active', 'closed_at'])
+        transaction.on_commit(lambda: send_poll_closed(poll))
+    return True
+
+
+class ExpiryScheduler:
+    """Close polls at their ``expires_at`` deadline.
+
+    Deadlines falling before the next refresh are kept in a min-heap, so the
+    scheduler sleeps until exactly the next one. The heap is reloaded every
+    ``refresh_interval`` seconds to pick up new or rescheduled polls.
+    """
+    
+    def __init__(self, refresh_interval=30):
+        self.refresh_interval = refresh_interval
+        self.heap = []
+    
+    def load(self, now=None):
+        """Load open polls expiring before the next refresh."""
+        now = now or timezone.now()
+        horizon = now + timedelta(seconds=self.refresh_interval)
+        self.heap = list(
+            Poll.objects.filter(is_active=True, expires_at__lte=horizon)
+            .order_by('expires_at')
+            .values_list('expires_at', 'id')
+        )
+        heapq.heapify(self.heap)
+    
+    def close_due(self, now=None):
+        """Close every poll whose deadline has passed; return their ids."""
+        now = now or timezone.now()
+        closed = []
+        while self.heap and self.heap[0][0] <= now:
+            _, poll_id = heapq.heappop(self.heap)
+            if close_poll(poll_id, now):
+                closed.append(poll_id)
+        return closed
+    
+    def seconds_until_next(self, now=None):
+        if not self.heap:
+            return None
+        now = now or timezone.now()
+        return max((self.heap[0][0] - now).total_seconds(), 0)
+    
+    def run(self, on_close=None):
+        """Run until interrupted, calling on_close(poll_ids) after each batch.
+        
+        Database errors (e.g. Postgres restarting) are logged and retried
+        after DATABASE_RETRY_SECONDS.
+        """
+        next_refresh = 0
+        while True:
+            # Drop connections past CONN_MAX_AGE or broken by an earlier error
+            close_old_connections()
+            try:
+                if time.monotonic() >= next_refresh:
+                    self.load()
+                    next_refresh = time.monotonic() + self.refresh_interval
+                
+                closed = self.close_due()
+            except DatabaseError as exc:
+                logger.warning('Poll scheduler database error, retrying: %s', exc)
+                # Deadlines popped before the error are reloaded
+                next_refresh = 0
+                time.sleep(DATABASE_RETRY_SECONDS)
+                continue
+            if closed and on_close:
+                on_close(closed)
+            
+            timeout = max(next_refresh - time.monotonic(), 0)
+            until_next = self.seconds_until_next()
+            if until_next is not None:
+                timeout = min(timeout, until_next)
+            time.sleep(timeout)
@@ -1,7 +1,18 @@
 from rest_framework import serializers
+from .events import record_answers
 from .models import Poll, Question, Choice, Answer
 
 
+def upsert_answers(answers):
+    """Save answers, overwriting the respondent's earlier answer to the same question."""
+    return Answer.objects.bulk_create(
+        answers,
+        update_conflicts=True,
+        unique_fields=['respondent', 'question'],
+        update_fields=['answer_data'],
+    )
+
+
 class ChoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Choice
@@ -10,10 +21,7 @@ class ChoiceSerializer(serializers.ModelSerializer):
 
 class QuestionSerializer(serializers.ModelSerializer):
     choices = ChoiceSerializer(many=True, read_only=True)
-    depends_on_question_id = serializers.IntegerField(
-        source='depends_on_question.id', 
-        read_only=True
-    )
+    depends_on_question_id = serializers.IntegerField(read_only=True)
     condition_value = serializers.CharField(read_only=True)
     condition_operator = serializers.CharField(read_only=True)
     
@@ -34,7 +42,7 @@ class PollSerializer(serializers.ModelSerializer):
         model = Poll
         fields = [
             'id', 'title', 'description', 'creator_username', 'created_at',
-            'expires_at', 'is_active', 'allow_anonymous', 'is_expired', 'questions'
+            'expires_at', 'is_active', 'allow_anonymous', 'is_expired', 'closed_at', 'questions'
         ]
 
 
@@ -104,45 +112,65 @@ class AnswerSubmitSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         answers_data = validated_data['answers']
         poll_id = self.context['poll_id']
-        user = self.context.get('request').user if self.context.get('request') else None
-        session_id = self.context.get('session_id', '')
+        respondent = validated_data['respondent']
+        request = self.context.get('request')
+        user = request.user if request and request.user.is_authenticated else None
         
-        created_answers = []
+        question_ids = [answer_data['question_id'] for answer_data in answers_data]
+        questions = Question.objects.filter(poll_id=poll_id).in_bulk(question_ids)
         
+        # Keyed by question so a repeated question keeps its last answer
+        answers = {}
         for answer_data in answers_data:
             question_id = answer_data['question_id']
-            answer_value = answer_data['answer_value']
-            
-            # Get the question to determine the answer format
-            try:
-                question = Question.objects.get(id=question_id, poll_id=poll_id)
-            except Question.DoesNotExist:
+            question = questions.get(question_id)
+            if question is None:
                 raise serializers.ValidationError(f"Question {question_id} not found")
             
-            # Create the answer
-            answer = Answer.objects.create(
+            # answer_value fills answer_data according to the question type
+            answer = Answer(
                 poll_id=poll_id,
                 question=question,
-                user=user,
-                session_id=session_id if not user else ''
+                respondent=respondent,
+                user=user
             )
-            
-            # Set the answer value based on question type
-            if question.question_type == 'single_choice':
-                answer.answer_data = {'choice_id': answer_value}
-            elif question.question_type == 'multiple_choice':
-                answer.answer_data = {'choice_ids': answer_value if isinstance(answer_value, list) else [answer_value]}
-            elif question.question_type == 'text':
-                answer.answer_data = {'text': answer_value}
-            else:
-                answer.answer_data = {'value': answer_value}
-            
-            answer.save()
-            created_answers.append(answer)
+            answer.answer_value = answer_data['answer_value']
+            answers[question_id] = answer
         
+        previous = dict(
+            Answer.objects.filter(respondent=respondent, question_id__in=answers.keys())
+            .values_list('question_id', 'answer_data')
+        )
+        created_answers = upsert_answers(list(answers.values()))
+        record_answers(respondent, created_answers, previous, complete=True)
         return created_answers[0] if created_answers else None
 
 
+class AnswerPageSerializer(serializers.Serializer):
+    """One page of answers for the resumable save endpoint."""
+    answers = serializers.ListField(child=serializers.DictField())
+    complete = serializers.BooleanField(default=False)
+    
+    def validate_answers(self, answers_data):
+        """Resolve each answer's question; returns {question_id: (question, answer_value)}."""
+        for answer_data in answers_data:
+            if 'question_id' not in answer_data or 'answer_value' not in answer_data:
+                raise serializers.ValidationError("Each answer needs a question_id and an answer_value")
+            if not isinstance(answer_data['question_id'], int):
+                raise serializers.ValidationError("question_id must be an integer")
+        
+        questions = self.context['poll'].questions.in_bulk(
+            [answer_data['question_id'] for answer_data in answers_data]
+        )
+        answers = {}
+        for answer_data in answers_data:
+            question = questions.get(answer_data['question_id'])
+            if question is None:
+                raise serializers.ValidationError(f"Question {answer_data['question_id']} not found")
+            answers[question.id] = (question, answer_data['answer_value'])
+        return answers
+
+
 class PollResultsSerializer(serializers.Serializer):
     question_id = serializers.IntegerField()
     question_text = serializers.CharField()
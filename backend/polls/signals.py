@@ -0,0 +1,31 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.dispatch import Signal, receiver
+
+from .results import invalidate_poll_results
+
+# Sent with a ``poll`` argument after a poll has been closed and its final
+# results stored.
+poll_closed = Signal()
+
+
+@receiver(poll_closed)
+def broadcast_poll_closed(sender, poll, **kwargs):
+    """Tell clients watching the poll that it has closed."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(
+        f'poll_{poll.id}',
+        {
+            'type': 'poll_closed',
+            'poll_id': poll.id,
+            'closed_at': poll.closed_at.isoformat(),
+        }
+    )
+
+
+@receiver(poll_closed)
+def invalidate_closed_poll_caches(sender, poll, **kwargs):
+    """Drop cached live results; the frozen final results replace them."""
+    invalidate_poll_results(poll.id)
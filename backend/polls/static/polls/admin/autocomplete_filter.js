@@ -0,0 +1,9 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Apply an autocomplete list filter as soon as a value is picked.
+    $(document).on('change', '.autocomplete-filter select', function() {
+        this.form.submit();
+    });
+}
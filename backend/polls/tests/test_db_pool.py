@@ -0,0 +1,34 @@
+"""Returning connections to the PostgreSQL pool."""
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from smart_polling.db_backends.postgresql_pool.base import ConnectionPool, DatabaseWrapper
+
+
+class PoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = ConnectionPool('default', size=1, timeout=0, max_age=None, health_check_after=30)
+        self.raw = mock.Mock(closed=False)
+        self.raw.info.transaction_status = 0
+        self.wrapper = DatabaseWrapper({
+            'NAME': 'test', 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+            'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False,
+            'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'TIME_ZONE': None,
+        })
+        self.wrapper.connection = self.pool.acquire(lambda: self.raw)
+        patcher = mock.patch.object(DatabaseWrapper, 'pool', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_close_returns_connection_to_pool(self):
+        self.wrapper._close()
+        self.raw.close.assert_not_called()
+        self.assertIs(self.pool.acquire(mock.Mock()), self.raw)
+
+    def test_close_in_atomic_block_discards_connection(self):
+        self.wrapper.in_atomic_block = True
+        self.wrapper._close()
+        self.raw.close.assert_called_once()
+        fresh = mock.Mock()
+        self.assertIs(self.pool.acquire(lambda: fresh), fresh)
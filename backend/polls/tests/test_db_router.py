@@ -0,0 +1,111 @@
+"""Routing reads between the primary and the read replica."""
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from polls import db_router
+from polls.db_router import (
+    PrimaryReplicaRouter, REPLICA_DB_ALIAS, replica_configured, replica_lag, replica_reads,
+    is_pinned_to_primary,
+)
+from polls.models import Poll, Question
+from polls.tests import TEST_SETTINGS
+
+
+class RoutingTestMixin:
+    def setUp(self):
+        super().setUp()
+        db_router._lag_cache.clear()
+        self.addCleanup(db_router._lag_cache.clear)
+
+
+# Not a TestCase: its transaction would keep every read on the primary
+@override_settings(**TEST_SETTINGS, REPLICA_MAX_LAG_SECONDS=2)
+@mock.patch('polls.db_router.replica_configured', return_value=True)
+class RouterTests(RoutingTestMixin, TransactionTestCase):
+    router = PrimaryReplicaRouter()
+
+    def db_for_read(self):
+        with replica_reads():
+            return self.router.db_for_read(Poll)
+
+    def test_reads_go_to_primary_unless_opted_in(self, _):
+        with mock.patch('polls.db_router._measure_lag', return_value=0.0):
+            self.assertEqual(self.router.db_for_read(Poll), 'default')
+            with replica_reads(enabled=False):
+                self.assertEqual(self.router.db_for_read(Poll), 'default')
+            self.assertEqual(self.db_for_read(), REPLICA_DB_ALIAS)
+
+    def test_lagging_replica_falls_back_to_primary(self, _):
+        with mock.patch('polls.db_router._measure_lag', return_value=5.0):
+            self.assertEqual(self.db_for_read(), 'default')
+
+    def test_unreachable_replica_falls_back_to_primary(self, _):
+        with mock.patch('polls.db_router._measure_lag', side_effect=DatabaseError('unreachable')):
+            self.assertEqual(self.db_for_read(), 'default')
+
+    def test_replica_without_tables_is_unhealthy(self, _):
+        empty = SQLiteDatabaseWrapper(
+            {**connections['default'].settings_dict, 'NAME': ':memory:'}, alias=REPLICA_DB_ALIAS
+        )
+        self.addCleanup(empty.close)
+        with mock.patch('polls.db_router.connections', {REPLICA_DB_ALIAS: empty}):
+            self.assertIsNone(replica_lag())
+
+    def test_reads_in_a_transaction_stay_on_primary(self, _):
+        with mock.patch('polls.db_router._measure_lag', return_value=0.0), transaction.atomic():
+            self.assertEqual(self.db_for_read(), 'default')
+
+    def test_submit_pins_respondent_to_primary(self, _):
+        poll = Poll.objects.create(title='Poll', creator=User.objects.create_user('creator'))
+        question = Question.objects.create(poll=poll, text='Why?', question_type='text')
+        response = self.client.post(
+            f'/api/answers/submit/{poll.id}/',
+            {'answers': [{'question_id': question.id, 'answer_value': 'Because'}]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        session_id = response.json()['session_id']
+        self.assertTrue(is_pinned_to_primary(poll.id, f'session:{session_id}'))
+        self.assertFalse(is_pinned_to_primary(poll.id, 'session:someone-else'))
+
+
+@skipUnless(replica_configured(), 'set SQLITE_REPLICA_NAME or POSTGRES_REPLICA_HOST to test with a replica')
+@override_settings(**TEST_SETTINGS, REPLICA_MAX_LAG_SECONDS=2)
+class ReplicaAliasTests(RoutingTestMixin, TransactionTestCase):
+    """Routing with both aliases; in tests the replica mirrors the primary."""
+    # The test runner sets up every alias named here, even for skipped tests
+    databases = {'default', REPLICA_DB_ALIAS} if replica_configured() else {'default'}
+
+    def setUp(self):
+        super().setUp()
+        self.poll = Poll.objects.create(title='Poll', creator=User.objects.create_user('creator'))
+        self.question = Question.objects.create(poll=self.poll, text='Why?', question_type='text')
+
+    def replica_queries(self, url, **params):
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_listing_reads_from_replica(self):
+        self.assertGreater(self.replica_queries('/api/polls/'), 0)
+
+    def test_lagging_replica_is_not_read(self):
+        with mock.patch('polls.db_router._measure_lag', return_value=5.0):
+            self.assertEqual(self.replica_queries('/api/polls/'), 0)
+
+    def test_respondent_reads_own_submission_from_primary(self):
+        response = self.client.post(
+            f'/api/answers/submit/{self.poll.id}/',
+            {'answers': [{'question_id': self.question.id, 'answer_value': 'Because'}]},
+            content_type='application/json',
+        )
+        session_id = response.json()['session_id']
+        url = f'/api/participation/{self.poll.id}/questions/'
+        self.assertEqual(self.replica_queries(url, session_id=session_id), 0)
+        self.assertGreater(self.replica_queries(url), 0)
@@ -0,0 +1,30 @@
+"""Load levels from queue latency samples."""
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from polls.load_shedding import NORMAL, SHED_ALL, LoadMonitor, LoadSheddingMiddleware
+
+
+class LoadMonitorTests(SimpleTestCase):
+    def test_one_slow_request_sheds_nothing(self):
+        monitor = LoadMonitor()
+        monitor.observe(3)
+        self.assertEqual(monitor.level(), NORMAL)
+        monitor.observe(3600)
+        self.assertEqual(monitor.level(), NORMAL)
+
+    def test_sustained_latency_sheds_everything(self):
+        monitor = LoadMonitor()
+        for _ in range(5):
+            monitor.observe(3)
+        self.assertEqual(monitor.level(), SHED_ALL)
+
+    def test_admin_pages_are_not_measured(self):
+        middleware = LoadSheddingMiddleware(lambda request: HttpResponse())
+        with mock.patch('polls.load_shedding.monitor') as monitor:
+            middleware(RequestFactory().get('/admin/polls/answer/'))
+            monitor.observe.assert_not_called()
+            middleware(RequestFactory().get('/api/polls/'))
+            monitor.observe.assert_called_once()
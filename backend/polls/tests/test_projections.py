@@ -0,0 +1,95 @@
+"""Projections of the submission event log, fed through the channel layer."""
+from collections import Counter
+from io import StringIO
+from unittest import mock
+
+import redis
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from polls import events
+from polls.consumers import ProjectionConsumer
+from polls.events import PROJECTIONS_CHANNEL
+from polls.management.commands.benchmark import build_answers
+from polls.models import Poll, Answer, Respondent, ResultTally, RespondentProgress
+from polls.projections import tally_options
+from polls.tests import TEST_SETTINGS
+
+
+# Transactions must really commit for on_commit notifications to be sent
+@override_settings(**TEST_SETTINGS)
+class ProjectionTests(TransactionTestCase):
+    def setUp(self):
+        call_command(
+            'generate_synthetic_data', polls=2, questions=8, respondents=50, seed=3,
+            stdout=StringIO(),
+        )
+        self.poll = Poll.objects.order_by('id').first()
+
+    def assertProjectionsMatchAnswers(self):
+        expected = Counter()
+        for question_id, answer_data in Answer.objects.values_list('question_id', 'answer_data'):
+            for option in tally_options(answer_data):
+                expected[(question_id, option)] += 1
+        tallies = {
+            (question_id, option): count
+            for question_id, option, count in ResultTally.objects.values_list('question_id', 'option', 'count')
+            if count
+        }
+        self.assertEqual(tallies, dict(expected))
+
+        answered = Counter(Answer.objects.values_list('respondent_id', flat=True))
+        self.assertEqual(RespondentProgress.objects.count(), Respondent.objects.count())
+        for progress in RespondentProgress.objects.select_related('respondent'):
+            self.assertEqual(progress.answered, answered[progress.respondent_id])
+            self.assertEqual(progress.complete, progress.respondent.is_complete)
+
+    def save_page(self, answers, **data):
+        response = self.client.post(
+            f'/api/answers/save/{self.poll.id}/', {'answers': answers, **data},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_rebuild_projections(self):
+        call_command('rebuild_projections', stdout=StringIO())
+        self.assertProjectionsMatchAnswers()
+
+        call_command('rebuild_projections', stdout=StringIO())
+        self.assertProjectionsMatchAnswers()
+
+    def test_worker_applies_saved_answers(self):
+        call_command('rebuild_projections', stdout=StringIO())
+        answers = build_answers(self.poll)
+        session_id = self.save_page(answers[:2])['session_id']
+        self.save_page(answers[2:], session_id=session_id, complete=True)
+
+        channel_layer = get_channel_layer()
+        consumer = ProjectionConsumer()
+        message = async_to_sync(channel_layer.receive)(PROJECTIONS_CHANNEL)
+        async_to_sync(consumer.dispatch)(message)
+        self.assertProjectionsMatchAnswers()
+
+        # The second notification is covered by the catch-up the first one ran
+        message = async_to_sync(channel_layer.receive)(PROJECTIONS_CHANNEL)
+        with mock.patch('polls.consumers.catch_up_all') as catch_up_all:
+            async_to_sync(consumer.dispatch)(message)
+        catch_up_all.assert_not_called()
+
+    @mock.patch.object(events, '_channel_layer_down_until', 0)
+    def test_unreachable_channel_layer(self):
+        channel_layer = mock.Mock()
+        channel_layer.send = mock.AsyncMock(side_effect=redis.ConnectionError('Connection refused'))
+        answers = build_answers(self.poll)
+        with mock.patch('polls.events.get_channel_layer', return_value=channel_layer):
+            with self.assertLogs('polls.events', 'WARNING') as logs:
+                session_id = self.save_page(answers[:2])['session_id']
+                self.save_page(answers[2:], session_id=session_id)
+        self.assertEqual(len(logs.records), 1)
+        channel_layer.send.assert_called_once()
+
+        call_command('rebuild_projections', '--catch-up', stdout=StringIO())
+        self.assertProjectionsMatchAnswers()
@@ -0,0 +1,42 @@
+"""Live poll results and their cache."""
+from unittest import mock
+
+import redis
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from polls.models import Poll, Question, Choice, Respondent, Answer
+from polls.tests import TEST_SETTINGS
+
+
+@override_settings(**TEST_SETTINGS)
+class ResultsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        creator = User.objects.create_user('creator')
+        cls.poll = Poll.objects.create(title='Poll', creator=creator)
+        cls.question = Question.objects.create(poll=cls.poll, text='Pick one', question_type='single_choice')
+        cls.yes = Choice.objects.create(question=cls.question, text='Yes')
+        cls.no = Choice.objects.create(question=cls.question, text='No', order=1)
+        for choice in (cls.yes, cls.yes, cls.no):
+            answer = Answer(poll=cls.poll, question=cls.question, respondent=Respondent.objects.create(poll=cls.poll))
+            answer.answer_value = choice.id
+            answer.save()
+
+    def get_results(self):
+        response = self.client.get(f'/api/polls/{self.poll.id}/results/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_results(self):
+        [question] = self.get_results()
+        self.assertEqual(question['results'], {'Yes': 2, 'No': 1})
+        self.assertEqual(question['total_responses'], 3)
+
+    def test_results_computed_while_cache_is_unreachable(self):
+        down = redis.ConnectionError('Connection refused')
+        with mock.patch('polls.results.cache') as cache:
+            cache.get.side_effect = down
+            cache.set.side_effect = down
+            [question] = self.get_results()
+        self.assertEqual(question['results'], {'Yes': 2, 'No': 1})
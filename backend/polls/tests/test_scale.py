@@ -0,0 +1,123 @@
+"""
+Query and latency budgets for the hot API paths.
+
+The polls come from generate_synthetic_data, so a query count that grows
+with the number of polls, questions or answers fails here before it reaches
+production. Run with ``python manage.py test polls.tests.test_scale``.
+
+SQLite can't count multiple choice answers, so results of the mixed polls
+are only checked on PostgreSQL; a poll without multiple choice questions
+checks the results budget everywhere.
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+
+from polls.management.commands.benchmark import build_answers
+from polls.models import Poll
+from polls.tests import TEST_SETTINGS
+
+# Generous enough for a slow CI machine; the query budgets are the real check
+MAX_SECONDS = 1.0
+
+
+@override_settings(**TEST_SETTINGS)
+class ScaleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_synthetic_data', polls=3, questions=10, respondents=200, seed=1,
+            stdout=StringIO(),
+        )
+        cls.poll = Poll.objects.order_by('id').first()
+        call_command(
+            'generate_synthetic_data', polls=1, questions=10, respondents=200, seed=3,
+            question_types='single_choice,text', stdout=StringIO(),
+        )
+        cls.poll_without_multiple_choice = Poll.objects.order_by('id').last()
+
+    def setUp(self):
+        cache.clear()
+
+    @contextmanager
+    def assertBudget(self, max_queries, max_seconds=MAX_SECONDS):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.monotonic()
+            yield
+            elapsed = time.monotonic() - started
+        self.assertLessEqual(
+            len(queries), max_queries,
+            '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+        self.assertLess(elapsed, max_seconds)
+
+    def test_list(self):
+        with self.assertBudget(3):
+            response = self.client.get('/api/polls/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 4)
+
+    def test_list_queries_do_not_grow_with_polls(self):
+        with CaptureQueriesContext(connection) as three_polls:
+            self.client.get('/api/polls/')
+        call_command('generate_synthetic_data', polls=2, respondents=10, seed=2, stdout=StringIO())
+        with CaptureQueriesContext(connection) as five_polls:
+            self.client.get('/api/polls/')
+        self.assertEqual(len(five_polls), len(three_polls))
+
+    def test_retrieve(self):
+        with self.assertBudget(3):
+            response = self.client.get(f'/api/polls/{self.poll.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def assertResultsBudget(self, poll):
+        with self.assertBudget(25):
+            response = self.client.get(f'/api/polls/{poll.id}/results/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertBudget(2):
+            self.client.get(f'/api/polls/{poll.id}/results/')
+
+    @skipUnlessDBFeature('supports_json_field_contains')
+    def test_results(self):
+        self.assertResultsBudget(self.poll)
+
+    def test_results_without_multiple_choice(self):
+        self.assertResultsBudget(self.poll_without_multiple_choice)
+
+    def test_questions(self):
+        with self.assertBudget(3):
+            response = self.client.get(f'/api/participation/{self.poll.id}/questions/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_submit(self):
+        answers = build_answers(self.poll)
+        with self.assertBudget(12):
+            response = self.client.post(
+                f'/api/answers/submit/{self.poll.id}/', {'answers': answers},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_save(self):
+        answers = build_answers(self.poll)
+        with self.assertBudget(12):
+            response = self.client.post(
+                f'/api/answers/save/{self.poll.id}/', {'answers': answers[:3]},
+                content_type='application/json', HTTP_IDEMPOTENCY_KEY=str(uuid.uuid4()),
+            )
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertBudget(12):
+            response = self.client.post(
+                f'/api/answers/save/{self.poll.id}/',
+                {'session_id': response.json()['session_id'], 'answers': answers[3:], 'complete': True},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
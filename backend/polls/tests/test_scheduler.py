@@ -0,0 +1,51 @@
+"""Closing polls at their deadline."""
+from datetime import timedelta
+from unittest import mock
+
+import redis
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from polls.models import Poll
+from polls.scheduler import ExpiryScheduler, close_poll
+from polls.tests import TEST_SETTINGS
+
+
+class Stop(Exception):
+    pass
+
+
+@override_settings(**TEST_SETTINGS)
+class SchedulerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.poll = Poll.objects.create(
+            title='Poll', creator=User.objects.create_user('creator'),
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+
+    def test_close_poll_survives_unreachable_channel_layer(self):
+        channel_layer = mock.Mock()
+        channel_layer.group_send = mock.AsyncMock(side_effect=redis.ConnectionError('Connection refused'))
+        with mock.patch('polls.signals.get_channel_layer', return_value=channel_layer), \
+                mock.patch('polls.signals.invalidate_poll_results') as invalidate, \
+                self.assertLogs('polls.scheduler', 'WARNING'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(close_poll(self.poll.id))
+
+        self.poll.refresh_from_db()
+        self.assertFalse(self.poll.is_active)
+        invalidate.assert_called_once_with(self.poll.id)
+
+    def test_run_retries_after_database_error(self):
+        scheduler = ExpiryScheduler()
+        with mock.patch.object(scheduler, 'load', side_effect=[OperationalError('server closed'), None]) as load, \
+                mock.patch('polls.scheduler.close_old_connections') as close_old_connections, \
+                mock.patch('polls.scheduler.time.sleep', side_effect=[None, Stop]), \
+                self.assertLogs('polls.scheduler', 'WARNING'):
+            with self.assertRaises(Stop):
+                scheduler.run()
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(close_old_connections.call_count, 2)
@@ -0,0 +1,60 @@
+"""Which bucket a request is rate limited in."""
+import uuid
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from polls import throttling
+from polls.models import Poll, Respondent
+from polls.tests import TEST_SETTINGS
+
+
+@override_settings(
+    **TEST_SETTINGS,
+    RATE_LIMIT_IP_RATE=0.001, RATE_LIMIT_IP_BURST=3,
+    RATE_LIMIT_RESPONDENT_RATE=0.001, RATE_LIMIT_RESPONDENT_BURST=3,
+)
+class ThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        creator = User.objects.create_user('creator')
+        cls.poll = Poll.objects.create(title='Poll', creator=creator)
+        cls.respondent = Respondent.objects.create(poll=cls.poll)
+
+    def setUp(self):
+        patcher = mock.patch.object(throttling, 'limiter', throttling.LocalTokenBuckets())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_questions(self, session_id=None, **headers):
+        params = {'session_id': session_id} if session_id else {}
+        return self.client.get(f'/api/participation/{self.poll.id}/questions/', params, **headers)
+
+    def test_made_up_session_ids_share_the_ip_bucket(self):
+        statuses = [self.get_questions(str(uuid.uuid4())).status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_respondent_session_has_its_own_bucket(self):
+        for _ in range(3):
+            self.get_questions()
+        self.assertEqual(self.get_questions().status_code, 429)
+        self.assertEqual(self.get_questions(str(self.respondent.session_id)).status_code, 200)
+
+    def test_forwarded_for_ignored_from_untrusted_address(self):
+        statuses = [
+            self.get_questions(HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code
+            for i in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    @override_settings(LOAD_SHED_TRUSTED_PROXIES=['127.0.0.1'])
+    def test_forwarded_for_read_from_trusted_proxy(self):
+        for _ in range(3):
+            self.get_questions(HTTP_X_FORWARDED_FOR='10.0.0.1, 10.0.0.2')
+        self.assertEqual(self.get_questions(HTTP_X_FORWARDED_FOR='10.0.0.2').status_code, 429)
+        self.assertEqual(self.get_questions(HTTP_X_FORWARDED_FOR='10.0.0.3').status_code, 200)
+
+    def test_views_without_a_poll_are_not_throttled(self):
+        statuses = {self.client.get('/api/answers/1/').status_code for _ in range(5)}
+        self.assertEqual(statuses, {404})
@@ -0,0 +1,172 @@
+"""Per-poll and per-respondent rate limiting with token buckets."""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import redis
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from smart_polling import metrics
+
+from .load_shedding import monitor, is_trusted_proxy
+from .models import Respondent
+
+# Atomically refill and take one token. Uses the Redis clock so every
+# worker sees the same time. Returns {allowed, seconds_to_wait}.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+
+class LocalTokenBuckets:
+    """In-process token buckets, used while Redis is unavailable."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity):
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+class TokenBucketLimiter:
+    """Token buckets stored in Redis, falling back to local buckets.
+
+    After a Redis error the limiter stays on the local buckets for
+    RATE_LIMIT_REDIS_RETRY_SECONDS instead of paying the timeout again on
+    every request.
+    """
+
+    def __init__(self):
+        self.local = LocalTokenBuckets()
+        self._redis = None
+        self._script = None
+        self._redis_down_until = 0
+
+    def _get_script(self):
+        if self._script is None:
+            self._redis = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=settings.RATE_LIMIT_REDIS_TIMEOUT,
+                socket_connect_timeout=settings.RATE_LIMIT_REDIS_TIMEOUT,
+            )
+            self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+        return self._script
+
+    def take(self, key, rate, capacity):
+        """Take a token; return (allowed, seconds until one is available)."""
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                allowed, wait = self._get_script()(keys=[key], args=[rate, capacity])
+                return bool(allowed), float(wait)
+            except redis.RedisError:
+                metrics.incr('rate_limit.redis_fallback')
+                self._redis_down_until = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+        return self.local.take(key, rate, capacity)
+
+
+limiter = TokenBucketLimiter()
+
+
+def is_respondent_session(poll_id, session_id):
+    """Whether session_id belongs to one of the poll's respondents."""
+    try:
+        session_id = uuid.UUID(str(session_id))
+    except ValueError:
+        return False
+    return Respondent.objects.filter(poll_id=poll_id, session_id=session_id).exists()
+
+
+class PollRespondentThrottle(BaseThrottle):
+    """Rate limit requests scoped to a poll.
+
+    Views name the URL kwarg holding the poll id in throttle_poll_kwarg;
+    other views are not throttled. Each respondent gets their own bucket per
+    poll, so voters sharing an IP are not throttled together. Anonymous
+    requests without the session ID of one of the poll's respondents fall
+    back to a larger per-IP bucket. Each poll gets an overall bucket so one
+    viral poll cannot starve the others. The poll-wide rate is scaled down
+    by RATE_LIMIT_OVERLOAD_FACTOR while the worker is overloaded.
+    """
+
+    def allow_request(self, request, view):
+        poll_kwarg = getattr(view, 'throttle_poll_kwarg', None)
+        poll_id = view.kwargs.get(poll_kwarg) if poll_kwarg else None
+        if not settings.RATE_LIMIT_ENABLED or not poll_id or not str(poll_id).isdigit():
+            return True
+
+        respondent = self.get_respondent(request, poll_id)
+        if respondent.startswith('ip:'):
+            scope, rate, burst = 'ip', settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST
+        else:
+            scope, rate, burst = 'respondent', settings.RATE_LIMIT_RESPONDENT_RATE, settings.RATE_LIMIT_RESPONDENT_BURST
+        poll_rate = settings.RATE_LIMIT_POLL_RATE
+        if monitor.overloaded():
+            poll_rate *= settings.RATE_LIMIT_OVERLOAD_FACTOR
+
+        buckets = [
+            (scope, f'ratelimit:poll:{poll_id}:{respondent}', rate, burst),
+            ('poll', f'ratelimit:poll:{poll_id}', poll_rate, settings.RATE_LIMIT_POLL_BURST),
+        ]
+        self.wait_seconds = None
+        for scope, key, rate, capacity in buckets:
+            allowed, wait = limiter.take(key, rate, capacity)
+            if not allowed:
+                metrics.incr(f'rate_limit.limited.{scope}')
+                self.wait_seconds = wait
+                return False
+        return True
+
+    def get_respondent(self, request, poll_id):
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        # Submit and save send the session ID in the body, reads in the query
+        data = request.data if isinstance(request.data, dict) else {}
+        session_id = data.get('session_id') or request.query_params.get('session_id')
+        # Made-up session IDs would each get a fresh bucket
+        if session_id and is_respondent_session(poll_id, session_id):
+            return f'session:{session_id}'
+        return f'ip:{self.get_ident(request)}'
+
+    def get_ident(self, request):
+        """The client's address, taken from X-Forwarded-For only behind a trusted proxy."""
+        remote_addr = request.META.get('REMOTE_ADDR', '')
+        forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded_for and is_trusted_proxy(remote_addr):
+            # Earlier entries are whatever the client sent; the last one the proxy saw
+            return forwarded_for.split(',')[-1].strip()
+        return remote_addr
+
+    def wait(self):
+        return self.wait_seconds
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PollViewSet, AnswerViewSet, PollParticipationViewSet
+from .views import PollViewSet, AnswerViewSet, PollParticipationViewSet, MetricsView
 
 router = DefaultRouter()
 router.register(r'polls', PollViewSet)
@@ -9,4 +9,5 @@ router.register(r'participation', PollParticipationViewSet, basename='participat
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
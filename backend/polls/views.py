@@ -1,24 +1,142 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.views import APIView
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.db.models import Count, Q
 from django.utils import timezone
+from collections import defaultdict
+from contextlib import ExitStack
 import uuid
 
-from .models import Poll, Question, Choice, Answer
+from smart_polling import metrics
+
+from .load_shedding import (
+    monitor, should_shed, ServiceOverloaded, CRITICAL, DEGRADABLE, OPTIONAL, SHED_READS
+)
+from .db_router import replica_reads, pin_to_primary, is_pinned_to_primary
+from .events import record_answers
+from .models import Poll, Question, Choice, Answer, Respondent
+from .results import CACHE_ERRORS, get_poll_results, get_cached_poll_results, cache_poll_results
 from .serializers import (
     PollSerializer, PollCreateSerializer, AnswerSerializer,
-    AnswerSubmitSerializer, PollResultsSerializer
+    AnswerSubmitSerializer, AnswerPageSerializer, upsert_answers
 )
 
 
-class PollViewSet(viewsets.ModelViewSet):
+# Cache value reserving an Idempotency-Key while its request is running
+IDEMPOTENCY_PENDING = 'pending'
+IDEMPOTENCY_PENDING_SECONDS = 60
+
+
+def respondent_key(user, session_id):
+    """Identify a respondent by user id, or by session id when anonymous."""
+    if user:
+        return f'user:{user.pk}'
+    if session_id:
+        return f'session:{session_id}'
+    return ''
+
+
+def get_respondent(poll, user, session_id, create=False, lock=False):
+    """Find a poll's respondent by user, or by session id when anonymous.
+    
+    With create=True a new respondent is started when none is found. With
+    lock=True the row stays locked until the current transaction ends.
+    """
+    respondents = Respondent.objects.select_for_update() if lock else Respondent.objects.all()
+    if user:
+        respondent = respondents.filter(poll=poll, user=user).first()
+        if respondent is None and create:
+            respondent, created = Respondent.objects.get_or_create(poll=poll, user=user)
+            if not created and lock:
+                # A concurrent request created it first; wait for its lock
+                respondent = respondents.get(pk=respondent.pk)
+        return respondent
+    
+    respondent = None
+    if session_id:
+        try:
+            respondent = respondents.filter(
+                poll=poll, session_id=uuid.UUID(str(session_id))
+            ).first()
+        except ValueError:
+            pass
+    if respondent is None and create:
+        respondent = Respondent.objects.create(poll=poll)
+    return respondent
+
+
+class ReplicaReadMixin:
+    """Serve the actions listed in replica_actions from the read replica."""
+    replica_actions = ()
+
+    def use_replica(self, request):
+        return self.action in self.replica_actions
+
+    def dispatch(self, request, *args, **kwargs):
+        # Closed in finally: DRF skips finalize_response on unhandled
+        # exceptions, which would leave the thread reading from the replica
+        self._replica_stack = ExitStack()
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            self._replica_stack.close()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # The action is only known once DRF has initialised the request
+        if self.use_replica(request):
+            self._replica_stack.enter_context(replica_reads())
+
+
+class LoadSheddingMixin:
+    """Shed requests by priority when this worker is overloaded.
+
+    Actions missing from shed_priorities are optional and rejected first.
+    Degradable actions are never rejected here; they check self.overloaded
+    and fall back to cached data themselves.
+    """
+    shed_priorities = {}
+    
+    def initial(self, request, *args, **kwargs):
+        level = monitor.level()
+        self.overloaded = level >= SHED_READS
+        priority = self.shed_priorities.get(self.action, OPTIONAL)
+        if priority != DEGRADABLE and should_shed(priority, level):
+            metrics.incr(f'load_shedding.shed.{self.action}')
+            raise ServiceOverloaded()
+        super().initial(request, *args, **kwargs)
+
+
+class PollViewSet(LoadSheddingMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """ViewSet for Poll operations."""
     queryset = Poll.objects.all()
     serializer_class = PollSerializer
     permission_classes = [AllowAny]
+    replica_actions = ('list', 'retrieve', 'results', 'stats')
+    throttle_poll_kwarg = 'pk'
+    shed_priorities = {
+        'create': CRITICAL,
+        'update': CRITICAL,
+        'partial_update': CRITICAL,
+        'destroy': CRITICAL,
+        'results': DEGRADABLE,
+    }
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Listings only show open polls unless closed ones are asked for
+        if self.action == 'list' and self.request.query_params.get('include_closed') != 'true':
+            queryset = queryset.filter(is_active=True)
+        if self.action in ('list', 'retrieve'):
+            # PollSerializer nests every question and choice
+            queryset = queryset.select_related('creator').prefetch_related('questions__choices')
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -45,112 +163,284 @@ class PollViewSet(viewsets.ModelViewSet):
         """Get aggregated results for a poll."""
         poll = self.get_object()
         
-        if not poll.is_active or poll.is_expired:
+        if not poll.is_active:
+            # Closed polls serve the results frozen when they were closed
+            if poll.final_results is not None:
+                return Response(poll.final_results)
             return Response(
                 {"error": "Poll is not active or has expired"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        results = []
-        questions = poll.questions.all()
-        
-        for question in questions:
-            question_results = self._get_question_results(question)
-            results.append(question_results)
+        # Overloaded workers serve cached results of any age rather than recompute
+        max_age = None if self.overloaded else settings.RESULTS_CACHE_SECONDS
+        try:
+            results = get_cached_poll_results(poll.id, max_age)
+        except CACHE_ERRORS:
+            # Without the cache results are computed on every request, overloaded or not
+            metrics.incr('results.cache_unavailable')
+            return Response(get_poll_results(poll))
+        if results is None:
+            if self.overloaded:
+                metrics.incr('load_shedding.shed.results')
+                raise ServiceOverloaded()
+            results = get_poll_results(poll)
+            cache_poll_results(poll.id, results)
+        elif self.overloaded:
+            metrics.incr('load_shedding.served_cached.results')
         
         return Response(results)
     
-    def _get_question_results(self, question):
-        """Calculate results for a specific question."""
-        answers = question.answers.all()
-        total_responses = answers.count()
-        
-        if question.question_type == 'single_choice':
-            results = {}
-            for choice in question.choices.all():
-                count = answers.filter(answer_data__choice_id=choice.id).count()
-                results[choice.text] = count
-            return PollResultsSerializer({
-                'question_id': question.id,
-                'question_text': question.text,
-                'question_type': question.question_type,
-                'results': results,
-                'total_responses': total_responses
-            }).data
-        
-        elif question.question_type == 'multiple_choice':
-            results = {}
-            for choice in question.choices.all():
-                count = answers.filter(answer_data__choice_ids__contains=choice.id).count()
-                results[choice.text] = count
-            return PollResultsSerializer({
-                'question_id': question.id,
-                'question_text': question.text,
-                'question_type': question.question_type,
-                'results': results,
-                'total_responses': total_responses
-            }).data
-        
-        elif question.question_type == 'text':
-            # For text questions, return sample responses
-            text_answers = answers.values_list('answer_data__text', flat=True)[:10]
-            return PollResultsSerializer({
-                'question_id': question.id,
-                'question_text': question.text,
-                'question_type': question.question_type,
-                'results': {'sample_responses': list(text_answers)},
-                'total_responses': total_responses
-            }).data
-        
-        return PollResultsSerializer({
-            'question_id': question.id,
-            'question_text': question.text,
-            'question_type': question.question_type,
-            'results': {},
-            'total_responses': total_responses
-        }).data
-
-
-class AnswerViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Get respondent counts and the completion rate for a poll."""
+        poll = self.get_object()
+        counts = poll.respondents.aggregate(
+            respondents=Count('id'),
+            completed=Count('id', filter=Q(status=Respondent.COMPLETE))
+        )
+        counts['completion_rate'] = (
+            counts['completed'] / counts['respondents'] if counts['respondents'] else 0.0
+        )
+        return Response(counts)
+
+
+class AnswerViewSet(LoadSheddingMixin, viewsets.ModelViewSet):
     """ViewSet for Answer operations."""
     queryset = Answer.objects.all()
     serializer_class = AnswerSerializer
     permission_classes = [AllowAny]
+    throttle_poll_kwarg = 'poll_id'
+    shed_priorities = {'submit_answers': CRITICAL, 'save_answers': CRITICAL}
     
     @action(detail=False, methods=['post'], url_path='submit/(?P<poll_id>[^/.]+)')
     def submit_answers(self, request, poll_id=None):
         """Submit answers for a poll with conditional logic support."""
         poll = get_object_or_404(Poll, id=poll_id)
         
-        if not poll.is_active or poll.is_expired:
+        if not poll.is_open:
             return Response(
                 {"error": "Poll is not active or has expired"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Generate session ID for anonymous users
-        session_id = str(uuid.uuid4()) if not request.user.is_authenticated else ''
-        
         serializer = AnswerSubmitSerializer(
             data=request.data,
-            context={'poll_id': poll_id, 'request': request, 'session_id': session_id}
+            context={'poll_id': poll_id, 'request': request}
         )
         serializer.is_valid(raise_exception=True)
         
-        # Validate conditional logic
-        answers_data = request.data.get('answers', [])
+        # Anonymous respondents resume with the session ID they were given
+        user = request.user if request.user.is_authenticated else None
+        session_id = request.data.get('session_id') or request.query_params.get('session_id', '')
+        with transaction.atomic():
+            # Lock the respondent so its status and saved answers can't change under us
+            respondent = get_respondent(poll, user, session_id, create=True, lock=True)
+            error = self._check_submission(poll, respondent, request.data.get('answers', []))
+            if error:
+                # Don't keep a respondent started by a rejected submission
+                transaction.set_rollback(True)
+                return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+            serializer.save(respondent=respondent)
+            respondent.status = Respondent.COMPLETE
+            respondent.completed_at = timezone.now()
+            respondent.save(update_fields=['status', 'completed_at'])
+        
+        session_id = str(respondent.session_id) if not user else ''
+        
+        # Let this respondent read their own answers back from the primary
+        pin_to_primary(poll.id, respondent_key(user, session_id))
+        
+        return Response(
+            {
+                "message": "Answers submitted successfully",
+                "session_id": session_id,
+                "respondent_id": respondent.id
+            },
+            status=status.HTTP_201_CREATED
+        )
+    
+    def _check_submission(self, poll, respondent, answers_data):
+        """Return why the respondent can't submit answers_data, or None."""
+        if respondent.is_complete:
+            return "Answers have already been submitted for this poll"
+        
+        # Answers already saved page by page count towards the submission
+        submitted_ids = {answer_data['question_id'] for answer_data in answers_data}
+        answers_data = [
+            {'question_id': answer.question_id, 'answer_value': answer.answer_value}
+            for answer in respondent.answers.select_related('question')
+            if answer.question_id not in submitted_ids
+        ] + answers_data
         if not self._validate_conditional_logic(poll, answers_data):
+            return "Invalid conditional logic in answers"
+        return None
+    
+    @action(detail=False, methods=['post'], url_path='save/(?P<poll_id>[^/.]+)')
+    def save_answers(self, request, poll_id=None):
+        """Save one page of answers, to be resumed with the returned session ID.
+        
+        Answers are upserted per question, so a retried page changes nothing.
+        A request repeating an Idempotency-Key (a client-generated UUID) gets
+        the original response back without touching the database. Saved
+        answers that a changed answer hides are deleted and listed in
+        "removed". Send "complete": true with the last page.
+        """
+        poll = get_object_or_404(Poll, id=poll_id)
+        
+        if not poll.is_open:
+            return Response(
+                {"error": "Poll is not active or has expired"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        user = request.user if request.user.is_authenticated else None
+        session_id = request.data.get('session_id') or request.query_params.get('session_id', '')
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if not idempotency_key:
+            return self._save_page(request, poll, user, session_id)
+        
+        # A first page has no session to scope the key to, so keys must be
+        # unguessable for one client's replay not to leak to another
+        try:
+            idempotency_key = uuid.UUID(idempotency_key)
+        except ValueError:
+            return Response(
+                {"error": "Idempotency-Key must be a UUID"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        scope = respondent_key(user, session_id) or 'new'
+        replay_key = f'answer-page:{poll.id}:{scope}:{idempotency_key}'
+        
+        # Reserve the key first so concurrent retries don't both do the work
+        if not cache.add(replay_key, IDEMPOTENCY_PENDING, IDEMPOTENCY_PENDING_SECONDS):
+            replay = cache.get(replay_key)
+            if replay is not None and replay != IDEMPOTENCY_PENDING:
+                metrics.incr('answers.idempotent_replays')
+                return Response(replay)
+            return Response(
+                {"error": "A request with this Idempotency-Key is in progress"}, 
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        try:
+            response = self._save_page(request, poll, user, session_id)
+        except BaseException:
+            cache.delete(replay_key)
+            raise
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(replay_key, response.data, settings.ANSWER_IDEMPOTENCY_SECONDS)
+        else:
+            # Rejected pages can be corrected and retried with the same key
+            cache.delete(replay_key)
+        return response
+    
+    def _save_page(self, request, poll, user, session_id):
+        serializer = AnswerPageSerializer(data=request.data, context={'poll': poll})
+        serializer.is_valid(raise_exception=True)
+        page = serializer.validated_data['answers']
+        complete = serializer.validated_data['complete']
+        
+        with transaction.atomic():
+            # Lock the respondent so concurrent pages for it apply one at a time
+            respondent = get_respondent(poll, user, session_id, create=True, lock=True)
+            response = self._apply_page(poll, user, respondent, page, complete)
+            if response.status_code != status.HTTP_200_OK:
+                # Don't keep a respondent started by a rejected first page
+                transaction.set_rollback(True)
+        return response
+    
+    def _apply_page(self, poll, user, respondent, page, complete):
+        """Save a page of answers for a respondent locked by the caller."""
+        if respondent.is_complete:
+            return Response(
+                {"error": "Answers have already been submitted for this poll"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        saved = {answer.question_id: answer for answer in respondent.answers.select_related('question')}
+        answer_values = {question_id: answer.answer_value for question_id, answer in saved.items()}
+        
+        # Only answers that differ from what is saved are written and re-validated
+        changed = []
+        for question_id, (question, answer_value) in page.items():
+            answer = Answer(poll=poll, question=question, respondent=respondent, user=user)
+            answer.answer_value = answer_value
+            answer_values[question_id] = answer.answer_value
+            if question_id not in saved or saved[question_id].answer_data != answer.answer_data:
+                changed.append(answer)
+        
+        hidden = self._hidden_by_changes(poll, page.keys(), {answer.question_id for answer in changed}, answer_values)
+        if hidden is None:
+            return Response(
+                {"error": "Invalid conditional logic in answers"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        removed = [saved[question_id] for question_id in hidden]
+        if complete and not self._validate_conditional_logic(poll, [
+            {'question_id': question_id, 'answer_value': value}
+            for question_id, value in answer_values.items()
+        ]):
             return Response(
                 {"error": "Invalid conditional logic in answers"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        serializer.save()
+        upsert_answers(changed)
+        if removed:
+            Answer.objects.filter(id__in=[answer.id for answer in removed]).delete()
+        if changed or complete:
+            record_answers(respondent, changed, {
+                question_id: answer.answer_data for question_id, answer in saved.items()
+            }, complete, removed)
+        if complete:
+            respondent.status = Respondent.COMPLETE
+            respondent.completed_at = timezone.now()
+            respondent.save(update_fields=['status', 'completed_at'])
         
-        return Response(
-            {"message": "Answers submitted successfully", "session_id": session_id},
-            status=status.HTTP_201_CREATED
-        )
+        session_id = str(respondent.session_id) if not user else ''
+        if changed:
+            pin_to_primary(poll.id, respondent_key(user, session_id))
+        
+        return Response({
+            "message": "Answers saved successfully",
+            "session_id": session_id,
+            "respondent_id": respondent.id,
+            "saved": [answer.question_id for answer in changed],
+            "removed": [answer.question_id for answer in removed],
+            "complete": complete
+        })
+    
+    def _hidden_by_changes(self, poll, page_ids, changed_ids, answer_values):
+        """Find saved answers that changed answers hide through conditional logic.
+        
+        Changed answers and the answers depending on them, directly or through
+        a hidden answer, are checked. Hidden answers are dropped from
+        answer_values and their question ids returned; returns None if an
+        answer on the page itself is hidden.
+        """
+        if not changed_ids:
+            return []
+        
+        questions = poll.questions.filter(id__in=answer_values.keys()).select_related('depends_on_question')
+        dependents = defaultdict(list)
+        for question in questions:
+            if question.id in changed_ids and not question.should_show(answer_values):
+                return None
+            dependents[question.depends_on_question_id].append(question)
+        
+        hidden = []
+        unchecked = list(changed_ids)
+        while unchecked:
+            for question in dependents[unchecked.pop()]:
+                if question.id not in answer_values or question.should_show(answer_values):
+                    continue
+                if question.id in page_ids:
+                    return None
+                del answer_values[question.id]
+                hidden.append(question.id)
+                unchecked.append(question.id)
+        return hidden
     
     def _validate_conditional_logic(self, poll, answers_data):
         """Validate that conditional logic is respected in the submitted answers."""
@@ -178,16 +468,27 @@ class AnswerViewSet(viewsets.ModelViewSet):
         return True
 
 
-class PollParticipationViewSet(viewsets.ViewSet):
+class PollParticipationViewSet(LoadSheddingMixin, ReplicaReadMixin, viewsets.ViewSet):
     """ViewSet for poll participation (getting questions with conditional logic)."""
     permission_classes = [AllowAny]
+    replica_actions = ('get_questions',)
+    throttle_poll_kwarg = 'pk'
+    shed_priorities = {'get_questions': CRITICAL}
+    
+    def use_replica(self, request):
+        if not super().use_replica(request):
+            return False
+        # Respondents who just submitted must see their answers (read-your-writes)
+        user = request.user if request.user.is_authenticated else None
+        session_id = request.query_params.get('session_id', '')
+        return not is_pinned_to_primary(self.kwargs.get('pk'), respondent_key(user, session_id))
     
     @action(detail=True, methods=['get'], url_path='questions')
     def get_questions(self, request, pk=None):
         """Get questions for a poll, respecting conditional logic based on previous answers."""
         poll = get_object_or_404(Poll, id=pk)
         
-        if not poll.is_active or poll.is_expired:
+        if not poll.is_open:
             return Response(
                 {"error": "Poll is not active or has expired"}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -201,7 +502,7 @@ class PollParticipationViewSet(viewsets.ViewSet):
         
         # Filter questions based on conditional logic
         visible_questions = []
-        for question in poll.questions.all():
+        for question in poll.questions.prefetch_related('choices'):
             if question.should_show(previous_answers):
                 question_data = {
                     'id': question.id,
@@ -225,14 +526,19 @@ class PollParticipationViewSet(viewsets.ViewSet):
         """Get previous answers for conditional logic evaluation."""
         previous_answers = {}
         
-        if user:
-            answers = Answer.objects.filter(poll=poll, user=user)
-        elif session_id:
-            answers = Answer.objects.filter(poll=poll, session_id=session_id)
-        else:
+        respondent = get_respondent(poll, user, session_id)
+        if respondent is None:
             return previous_answers
         
-        for answer in answers:
-            previous_answers[answer.question.id] = answer.answer_value
+        for answer in respondent.answers.select_related('question'):
+            previous_answers[answer.question_id] = answer.answer_value
         
         return previous_answers
+
+
+class MetricsView(APIView):
+    """Expose this worker's in-process metrics (connection pool, etc.)."""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(metrics.snapshot())
@@ -5,9 +5,9 @@ ASGI config for smart_polling project.
 import os
 
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.routing import ChannelNameRouter, ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
-from polls.routing import websocket_urlpatterns
+from polls.routing import websocket_urlpatterns, channel_routes
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_polling.settings')
 
@@ -18,4 +18,5 @@ application = ProtocolTypeRouter({
             websocket_urlpatterns
         )
     ),
+    "channel": ChannelNameRouter(channel_routes),
 })
@@ -0,0 +1,193 @@
+"""
+PostgreSQL backend with a bounded, process-wide connection pool.
+
+Under ASGI every HTTP request runs its sync code on a fresh thread, so
+Django's thread-local persistent connections (CONN_MAX_AGE) are never
+reused and each request pays for a new connection. This backend keeps
+open connections in a per-process pool instead: closing a connection
+returns it to the pool and the next request on any thread checks it out.
+
+Configure it with the ``POOL`` key of the database settings::
+
+    'ENGINE': 'smart_polling.db_backends.postgresql_pool',
+    'CONN_MAX_AGE': 0,
+    'POOL': {'SIZE': 10, 'TIMEOUT': 10, 'MAX_AGE': 600, 'HEALTH_CHECK_AFTER': 30},
+"""
+
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from smart_polling import metrics
+
+# Same value for psycopg2's TRANSACTION_STATUS_IDLE and psycopg's TransactionStatus.IDLE
+TRANSACTION_STATUS_IDLE = 0
+
+POOL_DEFAULTS = {
+    'SIZE': 10,
+    'TIMEOUT': 10,
+    'MAX_AGE': 600,
+    'HEALTH_CHECK_AFTER': 30,
+}
+
+
+class ConnectionPool:
+    """Bounded pool of raw DB-API connections shared by all threads."""
+
+    def __init__(self, alias, size, timeout, max_age, health_check_after):
+        self.alias = alias
+        self.size = size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_check_after = health_check_after
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        # (connection, created_at, returned_at), most recently returned last
+        self._idle = deque()
+        self._created_at = {}
+
+    def _metric(self, name):
+        return f'db.{self.alias}.pool.{name}'
+
+    def acquire(self, connect):
+        """Check out a connection, calling connect() if none is idle."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            metrics.incr(self._metric('timeouts'))
+            raise OperationalError(
+                f"Timed out after {self.timeout}s waiting for a connection "
+                f"from the '{self.alias}' pool (size {self.size})."
+            )
+        metrics.observe(self._metric('wait'), time.monotonic() - started)
+
+        try:
+            connection = self._checkout_idle()
+            if connection is not None:
+                metrics.incr(self._metric('reused'))
+                return connection
+
+            connect_started = time.monotonic()
+            connection = connect()
+            metrics.observe(self._metric('connect'), time.monotonic() - connect_started)
+            self._created_at[id(connection)] = time.monotonic()
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        """Return a connection to the pool, discarding it if it is unusable."""
+        try:
+            if self._reusable(connection):
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+            else:
+                self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def discard(self, connection):
+        """Close a checked-out connection instead of returning it to the pool."""
+        metrics.incr(self._metric('discarded'))
+        try:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def _checkout_idle(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, returned_at = self._idle.pop()
+
+            now = time.monotonic()
+            created_at = self._created_at.get(id(connection), now)
+            if self.max_age is not None and now - created_at > self.max_age:
+                self._discard(connection)
+                continue
+            if now - returned_at > self.health_check_after and not self._healthy(connection):
+                metrics.incr(self._metric('health_check_failures'))
+                self._discard(connection)
+                continue
+            return connection
+
+    def _reusable(self, connection):
+        if connection.closed:
+            return False
+        if connection.info.transaction_status == TRANSACTION_STATUS_IDLE:
+            return True
+        try:
+            connection.rollback()
+        except Exception:
+            return False
+        return connection.info.transaction_status == TRANSACTION_STATUS_IDLE
+
+    def _healthy(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, connection):
+        self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    # Key on the connection target too, so a settings change (e.g. the test
+    # runner switching NAME to the test database) never reuses old connections.
+    key = (alias,) + tuple(settings_dict.get(k) for k in ('NAME', 'USER', 'HOST', 'PORT'))
+    with _pools_lock:
+        if key not in _pools:
+            options = {**POOL_DEFAULTS, **settings_dict.get('POOL', {})}
+            _pools[key] = ConnectionPool(
+                alias,
+                size=options['SIZE'],
+                timeout=options['TIMEOUT'],
+                max_age=options['MAX_AGE'],
+                health_check_after=options['HEALTH_CHECK_AFTER'],
+            )
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        # The parent sets isolation_level when it opens a connection; pooled
+        # connections handed to a new wrapper need it set here.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel(isolation_level) if isolation_level is not None
+            else IsolationLevel.READ_COMMITTED
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.in_atomic_block:
+            # close() inside atomic() keeps self.connection around until the
+            # block exits, so it must never be handed to another thread.
+            self.pool.discard(self.connection)
+        else:
+            self.pool.release(self.connection)
@@ -0,0 +1,62 @@
+"""
+Lightweight in-process metrics.
+
+Counters and timings are kept per worker process and exposed through the
+``/api/metrics/`` endpoint.
+"""
+
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+# name -> [count, total_seconds, max_seconds]
+_timings = defaultdict(lambda: [0, 0.0, 0.0])
+
+
+def incr(name, value=1):
+    """Increment a counter."""
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, seconds):
+    """Record a duration in seconds."""
+    with _lock:
+        timing = _timings[name]
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2] = max(timing[2], seconds)
+
+
+def snapshot():
+    """Return a copy of all counters and timing summaries."""
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'timings': {
+                name: {
+                    'count': count,
+                    'total_seconds': total,
+                    'avg_seconds': total / count if count else 0.0,
+                    'max_seconds': max_seconds,
+                }
+                for name, (count, total, max_seconds) in _timings.items()
+            },
+        }
+
+
+def reset():
+    """Clear all metrics."""
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+
+
+def record_connection_created(sender, connection, **kwargs):
+    """connection_created handler counting database connections.
+
+    With the pooled backend this fires on every checkout from the pool,
+    including reused connections; see the pool's own connect/reused metrics.
+    """
+    incr(f'db.{connection.alias}.connections_opened')
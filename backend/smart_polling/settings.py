@@ -39,6 +39,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'polls.load_shedding.LoadSheddingMiddleware',
 ]
 
 ROOT_URLCONF = 'smart_polling.urls'
@@ -73,9 +74,30 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
         'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Connection pooling. With DB_POOL_SIZE > 0 (the default) connections are
+# kept in a bounded per-process pool shared by all threads, which is what
+# makes them reusable under ASGI. Django "closes" the connection at the end
+# of every request, returning it to the pool. Set DB_POOL_SIZE=0 to use
+# Django's thread-local persistent connections (DB_CONN_MAX_AGE) instead.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))
+if DB_POOL_SIZE > 0:
+    DATABASES['default'].update({
+        'ENGINE': 'smart_polling.db_backends.postgresql_pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'SIZE': DB_POOL_SIZE,
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            'MAX_AGE': int(os.environ.get('DB_POOL_MAX_AGE', '600')),
+            'HEALTH_CHECK_AFTER': float(os.environ.get('DB_POOL_HEALTH_CHECK_AFTER', '30')),
+        },
+    })
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
 # Fallback to SQLite for development
 if os.environ.get('USE_SQLITE', 'False').lower() == 'true':
     DATABASES = {
@@ -85,6 +107,31 @@ if os.environ.get('USE_SQLITE', 'False').lower() == 'true':
         }
     }
 
+# Optional read replica. Safe reads (poll listing, detail, results and
+# participation questions) are routed to it by polls.db_router.
+if os.environ.get('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('POSTGRES_REPLICA_HOST'),
+        'PORT': os.environ.get('POSTGRES_REPLICA_PORT', DATABASES['default'].get('PORT', '')),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif os.environ.get('SQLITE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / os.environ.get('SQLITE_REPLICA_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['polls.db_router.PrimaryReplicaRouter']
+
+# Seconds a respondent's reads stay on the primary after they submit answers
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '5'))
+# Replica lag above which reads fall back to the primary
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '2'))
+# How often each process re-measures replica lag
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', '1'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -121,6 +168,9 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'polls.throttling.PollRespondentThrottle',
+    ],
 }
 
 # CORS settings
@@ -136,7 +186,72 @@ CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            "hosts": [REDIS_URL],
+            # Fail fast when Redis is down instead of stalling the request
+            "hosts": [{"address": REDIS_URL, "socket_connect_timeout": 1}],
         },
     },
 }
+
+# Shared cache: replica read pins, results and idempotency replays must be
+# visible to every worker process. USE_LOCAL_CACHE is for single-process
+# development without Redis only.
+if os.environ.get('USE_LOCAL_CACHE', 'False').lower() == 'true':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'smart_polling',
+            'OPTIONS': {
+                'socket_connect_timeout': 1,
+                'socket_timeout': 1,
+            },
+        }
+    }
+
+# WebSocket batching for the v2 poll protocols (see polls/protocol.py)
+WS_BATCH_INTERVAL = float(os.environ.get('WS_BATCH_INTERVAL', '0.05'))
+WS_BATCH_MAX_MESSAGES = int(os.environ.get('WS_BATCH_MAX_MESSAGES', '50'))
+
+# Per-poll rate limiting (token buckets in Redis, local fallback)
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+RATE_LIMIT_RESPONDENT_RATE = float(os.environ.get('RATE_LIMIT_RESPONDENT_RATE', '2'))
+RATE_LIMIT_RESPONDENT_BURST = int(os.environ.get('RATE_LIMIT_RESPONDENT_BURST', '20'))
+# Anonymous requests without a session ID share a bucket per IP; many
+# respondents can sit behind one NAT, so it is much larger
+RATE_LIMIT_IP_RATE = float(os.environ.get('RATE_LIMIT_IP_RATE', '20'))
+RATE_LIMIT_IP_BURST = int(os.environ.get('RATE_LIMIT_IP_BURST', '200'))
+RATE_LIMIT_POLL_RATE = float(os.environ.get('RATE_LIMIT_POLL_RATE', '500'))
+RATE_LIMIT_POLL_BURST = int(os.environ.get('RATE_LIMIT_POLL_BURST', '1000'))
+# Poll-wide rate multiplier while the worker is overloaded
+RATE_LIMIT_OVERLOAD_FACTOR = float(os.environ.get('RATE_LIMIT_OVERLOAD_FACTOR', '0.5'))
+RATE_LIMIT_REDIS_TIMEOUT = 0.1
+RATE_LIMIT_REDIS_RETRY_SECONDS = 5
+
+# Load shedding thresholds on queue latency (seconds): optional reads are
+# rejected and results served from cache first, submissions only last.
+LOAD_SHED_READS_LATENCY = float(os.environ.get('LOAD_SHED_READS_LATENCY', '0.5'))
+LOAD_SHED_ALL_LATENCY = float(os.environ.get('LOAD_SHED_ALL_LATENCY', '2'))
+# Proxies (IPs or CIDR ranges) whose X-Request-Start and X-Forwarded-For
+# headers are trusted
+LOAD_SHED_TRUSTED_PROXIES = [
+    proxy.strip() for proxy in os.environ.get('LOAD_SHED_TRUSTED_PROXIES', '').split(',') if proxy.strip()
+]
+
+# Live results are cached briefly, and kept longer as a fallback under load
+RESULTS_CACHE_SECONDS = int(os.environ.get('RESULTS_CACHE_SECONDS', '2'))
+RESULTS_STALE_SECONDS = int(os.environ.get('RESULTS_STALE_SECONDS', '300'))
+
+# How long a saved answer page's response is replayed for a repeated Idempotency-Key
+ANSWER_IDEMPOTENCY_SECONDS = int(os.environ.get('ANSWER_IDEMPOTENCY_SECONDS', '86400'))
+
+# How long projections keep looking for a skipped submission event id, which
+# is either still being committed or was rolled back
+PROJECTION_GAP_SECONDS = float(os.environ.get('PROJECTION_GAP_SECONDS', '300'))
+# After failing to reach the channel layer, skip projection notifications this long
+PROJECTION_NOTIFY_RETRY_SECONDS = 5